@@ -1,14 +1,178 @@
+from datetime import datetime, timedelta
+
 from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import models
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from blog.models import Comment, Post, Tag
+from blog.search import search_post_ids
+
+ESTIMATED_COUNT_THRESHOLD = 100000
+SEARCH_RESULTS_LIMIT = 1000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that estimates size of big unfiltered changelists by the span of ids instead of counting every row."""
+
+    is_count_estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return super().count
+        ids = queryset.order_by().values_list('pk', flat=True)
+        first_id = ids.order_by('pk').first()
+        if first_id is None:
+            return 0
+        estimated_count = ids.order_by('-pk').first() - first_id + 1
+        if estimated_count < ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        self.is_count_estimated = True
+        return estimated_count
+
+    def page(self, number):
+        """
+        Get page of the list. Ids have gaps, so the estimate is too big and the last pages may be empty,
+        such pages are replaced by the last real one and the rows are counted for real.
+        """
+        page = super().page(number)
+        if len(page) or not self.is_count_estimated:
+            return page
+        self.is_count_estimated = False
+        self.__dict__['count'] = self.object_list.count()
+        self.__dict__.pop('num_pages', None)
+        return super().page(self.num_pages)
+
+
+def get_period_starts(first_date, last_date, kind: str) -> list:
+    """
+    List starts of years, months or days between two dates.
+    :params first_date: date of the first period.
+    :params last_date: date of the last period.
+    :params kind: 'year', 'month' or 'day'.
+    :return: list of naive datetimes.
+    """
+    if kind == 'year':
+        return [datetime(year, 1, 1) for year in range(first_date.year, last_date.year + 1)]
+    if kind == 'month':
+        months = range(first_date.year * 12 + first_date.month - 1, last_date.year * 12 + last_date.month)
+        return [datetime(month // 12, month % 12 + 1, 1) for month in months]
+    first_day = datetime(first_date.year, first_date.month, first_date.day)
+    return [first_day + timedelta(days=day) for day in range((last_date - first_date).days + 1)]
+
+
+def get_period_end(period_start: datetime, kind: str) -> datetime:
+    if kind == 'year':
+        return period_start.replace(year=period_start.year + 1)
+    if kind == 'month':
+        return (period_start + timedelta(days=32)).replace(day=1)
+    return period_start + timedelta(days=1)
+
 
-from blog.models import Post, Comment
+class DateHierarchyQuerySet(models.QuerySet):
+    """
+    Queryset for admin date hierarchy. Dates with objects are found by checking the index period by period,
+    instead of truncating the date of every row in SQL.
+    """
+
+    def get_edge_value(self, field_name: str, last: bool = False):
+        values = self.filter(**{f'{field_name}__isnull': False}).values_list(field_name, flat=True)
+        return values.order_by(f'-{field_name}' if last else field_name).first()
+
+    def aggregate(self, *args, **kwargs):
+        """Min and max of a column are read from the ends of its index, one query each, not by scanning it."""
+        is_edges_aggregate = not args and kwargs and all(
+            isinstance(aggregate, (models.Min, models.Max)) and aggregate.filter is None
+            and isinstance(aggregate.source_expressions[0], models.F)
+            for aggregate in kwargs.values()
+        )
+        if not is_edges_aggregate:
+            return super().aggregate(*args, **kwargs)
+        return {
+            alias: self.get_edge_value(aggregate.source_expressions[0].name, last=isinstance(aggregate, models.Max))
+            for alias, aggregate in kwargs.items()
+        }
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None, is_dst=None):
+        first_value = self.get_edge_value(field_name)
+        if first_value is None:
+            return []
+        last_value = self.get_edge_value(field_name, last=True)
+
+        period_datetimes = []
+        for period_start in get_period_starts(
+            timezone.localtime(first_value).date(),
+            timezone.localtime(last_value).date(),
+            kind,
+        ):
+            start = timezone.make_aware(period_start)
+            end = timezone.make_aware(get_period_end(period_start, kind))
+            if self.filter(**{f'{field_name}__gte': start, f'{field_name}__lt': end}).exists():
+                period_datetimes.append(start)
+        return period_datetimes if order == 'ASC' else period_datetimes[::-1]
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """Admin of big tables: no full counts, date hierarchy that uses the index."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateHierarchyQuerySet(model=queryset.model, query=queryset.query, using=queryset.db)
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScalableModelAdmin):
+    list_display = ('title', 'author', 'published_at', 'likes_count', 'comments_count')
+    list_select_related = ('author',)
+    ordering = ('-published_at', '-id')
+    date_hierarchy = 'published_at'
+    search_fields = ('title',)
+    autocomplete_fields = ('author', 'tags')
     raw_id_fields = ('likes',)
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search posts with the full-text index, exact slug matches are found too.
+        Without the index only titles are searched, with LIKE.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        found_ids = search_post_ids(search_term, SEARCH_RESULTS_LIMIT)
+        found_posts = models.Q(title__icontains=search_term) if found_ids is None else models.Q(id__in=found_ids)
+        return queryset.filter(found_posts | models.Q(slug=search_term)), False
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('title', 'posts_count')
+    search_fields = ('title',)
+
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
-    raw_id_fields = ('post', 'author')
-    list_display = ('text', 'published_at')
+class CommentAdmin(ScalableModelAdmin):
+    list_display = ('text', 'post', 'author', 'published_at')
+    list_select_related = ('post', 'author')
+    ordering = ('-published_at', '-id')
+    date_hierarchy = 'published_at'
+    search_fields = ('author__username', 'post__slug')
+    autocomplete_fields = ('post', 'author')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('post__text')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Find comments by exact username of the author or slug of the post, both are looked up by index."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        authors = User.objects.filter(username=search_term).values('id')
+        posts = Post.objects.filter(slug=search_term).values('id')
+        return queryset.filter(models.Q(author__in=authors) | models.Q(post__in=posts)), False
@@ -0,0 +1,150 @@
+from functools import wraps
+
+import orjson
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+
+from blog.conditional import group_etag
+from blog.models import Post, Tag
+from blog.page_cache import cache_page_for_anonymous, get_index_group, get_post_group
+from blog.pagination import encode_cursor, paginate_by_keyset
+from blog.serializers import POST_CARD_FIELDS, POST_FIELD_COLUMNS, select_post_cards, serialize_post_cards
+from blog.views import get_comments_page
+
+POST_DETAIL_FIELDS = tuple(field for field in POST_FIELD_COLUMNS if field != 'teaser_text')
+TAG_FIELDS = {
+    'title': 'title',
+    'posts_with_tag': 'posts_count',
+}
+
+
+class ApiError(Exception):
+    """Error in request parameters, it is returned to the client with 400 status."""
+
+
+def api_response(data: dict, status: int = 200) -> HttpResponse:
+    return HttpResponse(orjson.dumps(data), content_type='application/json', status=status)
+
+
+def api_view(view):
+    """Decorator that turns errors of request parameters and missing objects into JSON responses."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return api_response({'error': str(error)}, status=400)
+        except Http404 as error:
+            return api_response({'error': str(error) or 'Not found'}, status=404)
+    return wrapper
+
+
+def get_fields(request: WSGIRequest, allowed_fields, default_fields=None) -> tuple:
+    """
+    Parse sparse field selection like ?fields=title,slug.
+    :params allowed_fields: names of fields the endpoint has.
+    :params default_fields: fields returned without the parameter, by default all allowed ones.
+    :return: tuple of field names in the order of the request.
+    :raises ApiError: if unknown field is asked.
+    """
+    fields_param = request.GET.get('fields')
+    if not fields_param:
+        return tuple(default_fields or allowed_fields)
+    fields = tuple(dict.fromkeys(field.strip() for field in fields_param.split(',') if field.strip()))
+    unknown_fields = [field for field in fields if field not in allowed_fields]
+    if unknown_fields or not fields:
+        raise ApiError(f"Unknown fields: {', '.join(unknown_fields)}. Allowed: {', '.join(allowed_fields)}")
+    return fields
+
+
+def get_page_size(request: WSGIRequest) -> int:
+    limit = request.GET.get('limit', '')
+    if not limit:
+        return settings.API_PAGE_SIZE
+    if not limit.isdigit() or not 1 <= int(limit) <= settings.API_MAX_PAGE_SIZE:
+        raise ApiError(f'limit must be a number from 1 to {settings.API_MAX_PAGE_SIZE}')
+    return int(limit)
+
+
+def get_next_url(request: WSGIRequest, next_cursor: str):
+    if not next_cursor:
+        return None
+    params = {key: value for key, value in request.GET.items() if key != 'after'}
+    return f"{request.path}?{urlencode({**params, 'after': next_cursor})}"
+
+
+@api_view
+@condition(etag_func=group_etag(get_index_group))
+@cache_page_for_anonymous(get_index_group)
+def posts_list(request: WSGIRequest) -> HttpResponse:
+    """Newest posts, optionally of one tag, with cursor pagination."""
+    fields = get_fields(request, POST_DETAIL_FIELDS, POST_CARD_FIELDS)
+    per_page = get_page_size(request)
+    posts = Post.objects.all()
+    if request.GET.get('tag'):
+        posts = Post.objects.filter_by_tag(get_object_or_404(Tag, title=request.GET['tag']))
+
+    posts = select_post_cards(posts, fields)
+    posts_page = paginate_by_keyset(posts, 1, after=request.GET.get('after'), per_page=per_page)
+    page_posts = posts_page['objects']
+    next_cursor = None
+    if posts_page['has_next']:
+        next_cursor = encode_cursor(page_posts[-1]['published_at'], page_posts[-1]['id'])
+    return api_response({
+        'results': serialize_post_cards(page_posts, fields),
+        'next': get_next_url(request, next_cursor),
+    })
+
+
+@api_view
+@condition(etag_func=group_etag(get_post_group))
+@cache_page_for_anonymous(get_post_group)
+def post_detail(request: WSGIRequest, slug: str) -> HttpResponse:
+    fields = get_fields(request, POST_DETAIL_FIELDS)
+    rows = select_post_cards(Post.objects.filter(slug=slug).order_by(), fields)[:1]
+    if not rows:
+        raise Http404('Post not found')
+    return api_response({
+        **serialize_post_cards(rows, fields)[0],
+        'comments_url': reverse('api_post_comments', kwargs={'slug': slug}),
+    })
+
+
+@api_view
+@condition(etag_func=group_etag(get_post_group))
+@cache_page_for_anonymous(get_post_group)
+def post_comments(request: WSGIRequest, slug: str) -> HttpResponse:
+    """Comments of the post, oldest first, with cursor pagination."""
+    post_ids = Post.objects.filter(slug=slug).order_by().values_list('id', flat=True)[:1]
+    if not post_ids:
+        raise Http404('Post not found')
+    comments_page = get_comments_page(post_ids[0], request.GET.get('after'), get_page_size(request))
+    return api_response({
+        'results': comments_page['comments'],
+        'next': get_next_url(request, comments_page['next_cursor']),
+    })
+
+
+@api_view
+@condition(etag_func=group_etag(get_index_group))
+@cache_page_for_anonymous(get_index_group)
+def tags_list(request: WSGIRequest) -> HttpResponse:
+    """Tags ordered by title, the cursor is the title of the last tag on the previous page."""
+    fields = get_fields(request, tuple(TAG_FIELDS))
+    per_page = get_page_size(request)
+    tags = Tag.objects.order_by('title')
+    if request.GET.get('after'):
+        tags = tags.filter(title__gt=request.GET['after'])
+    columns = {'title', *(TAG_FIELDS[field] for field in fields)}
+    page_tags = list(tags.values(*columns)[:per_page + 1])
+
+    next_cursor = page_tags[per_page - 1]['title'] if len(page_tags) > per_page else None
+    return api_response({
+        'results': [{field: tag[TAG_FIELDS[field]] for field in fields} for tag in page_tags[:per_page]],
+        'next': get_next_url(request, next_cursor),
+    })
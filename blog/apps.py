@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, **kwargs):
+    from blog.search import ensure_fts_index
+    ensure_fts_index()
 
 
 class BlogConfig(AppConfig):
     name = 'blog'
+
+    def ready(self):
+        import blog.signals  # noqa: F401
+        from blog.query_stats import install_query_collector
+        from blog.sqlite import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas)
+        connection_created.connect(install_query_collector)
+        post_migrate.connect(ensure_search_index, sender=self)
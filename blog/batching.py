@@ -0,0 +1,31 @@
+def iterate_batches(objects, batch_size: int):
+    """
+    Split any iterable into lists without reading it whole.
+    :params objects: iterable to split.
+    :params batch_size: max amount of objects in one batch.
+    :return: generator of lists.
+    """
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iterate_id_batches(queryset, batch_size: int):
+    """
+    Split ids of queryset into sorted batches without loading objects.
+    :params queryset: objects to split.
+    :params batch_size: max amount of ids in one batch.
+    :return: generator of id lists.
+    """
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
@@ -0,0 +1,187 @@
+import random
+import time
+from urllib.parse import urlencode, urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.core.cache import caches
+from django.db import OperationalError, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import ArchiveMonth, Comment, Post, Tag
+from blog.pagination import POSTS_PER_PAGE, encode_cursor
+
+
+def clear_caches():
+    for cache_alias in ('default', 'pages', 'template_fragments'):
+        caches[cache_alias].clear()
+
+
+def get_benchmark_urls() -> dict:
+    """
+    Pick urls that represent every view on the current data.
+    :return: dict with labels as keys and urls as values.
+    """
+    urls = {'index': reverse('index')}
+    posts_amount = Post.objects.count()
+    deep_page = max(1, posts_amount // POSTS_PER_PAGE // 2)
+    urls['index_deep_page'] = reverse('index', kwargs={'page': deep_page})
+    last_post_on_first_page = Post.objects.order_by('-published_at', '-id').values(
+        'published_at', 'id')[POSTS_PER_PAGE - 1:POSTS_PER_PAGE].first()
+    if last_post_on_first_page:
+        cursor = encode_cursor(last_post_on_first_page['published_at'], last_post_on_first_page['id'])
+        urls['index_keyset_page'] = f"{reverse('index', kwargs={'page': 2})}?after={cursor}"
+
+    popular_post = Post.objects.order_by('-likes_count').only('slug').first()
+    if popular_post:
+        urls['post_detail_popular'] = reverse('post_detail', kwargs={'slug': popular_post.slug})
+    commented_post = Post.objects.order_by('-comments_count').only('slug').first()
+    if commented_post:
+        urls['post_detail_most_commented'] = reverse('post_detail', kwargs={'slug': commented_post.slug})
+        urls['post_comments'] = reverse('post_comments', kwargs={'slug': commented_post.slug})
+
+    popular_tag = Tag.objects.get_popular_posts().only('title').first()
+    if popular_tag:
+        urls['tag_filter_popular'] = reverse('tag_filter', kwargs={'tag_title': popular_tag.title})
+
+    archive_month = ArchiveMonth.objects.order_by('-posts_count').first()
+    if archive_month:
+        urls['archive_month'] = archive_month.get_absolute_url()
+        urls['archive_year'] = reverse('archive', kwargs={'year': archive_month.year})
+
+    urls['feed'] = reverse('feed', kwargs={'feed_format': 'rss'})
+    urls['api_posts'] = f"{reverse('api_posts')}?limit=100"
+    if popular_tag:
+        urls['tag_feed'] = reverse('tag_feed', kwargs={'tag_title': popular_tag.title, 'feed_format': 'atom'})
+
+    if popular_post:
+        query = popular_post.title.split()[0] if popular_post.title.split() else popular_post.slug
+        urls['search'] = f"{reverse('search')}?{urlencode({'q': query})}"
+    return urls
+
+
+def read_post(rng: random.Random, post_ids: list):
+    post = Post.objects.select_related('author').prefetch_tags().get(id=rng.choice(post_ids))
+    list(post.comments.select_related('author').order_by('-published_at', '-id')[:20])
+
+
+def write_comment(rng: random.Random, post_ids: list, user_ids: list):
+    with transaction.atomic():
+        Comment.objects.create(
+            post_id=rng.choice(post_ids),
+            author_id=rng.choice(user_ids),
+            text='Benchmark comment',
+            published_at=timezone.now(),
+        )
+
+
+def run_sqlite_worker(role: str, profile: dict, post_ids: list, user_ids: list, duration: float, barrier, results):
+    """
+    Run reads or writes in a forked process until the time is over, like a gunicorn worker.
+    :params role: reader or writer.
+    :params profile: database settings of the worker, see benchmark_sqlite command.
+    :params duration: seconds to run after all workers are ready.
+    :params barrier: multiprocessing.Barrier shared by all workers.
+    :params results: multiprocessing.Queue to put the worker result to.
+    """
+    from django.conf import settings
+    from django.db import connection
+
+    from blog.query_stats import get_percentile
+
+    settings.SQLITE_PRODUCTION_MODE = profile['production_mode']
+    connection.settings_dict.update({
+        'NAME': profile['name'],
+        'CONN_MAX_AGE': profile['conn_max_age'],
+        'OPTIONS': {'timeout': profile['timeout']},
+    })
+
+    rng = random.Random()
+    latencies = []
+    errors = 0
+    barrier.wait()
+    finish_at = time.perf_counter() + duration
+    while time.perf_counter() < finish_at:
+        started_at = time.perf_counter()
+        try:
+            if role == 'writer':
+                write_comment(rng, post_ids, user_ids)
+            else:
+                read_post(rng, post_ids)
+        except OperationalError:
+            errors += 1
+        else:
+            latencies.append((time.perf_counter() - started_at) * 1000)
+        connection.close_if_unusable_or_obsolete()
+    connection.close()
+
+    latencies.sort()
+    results.put({
+        'role': role,
+        'operations': len(latencies),
+        'errors': errors,
+        'p50_ms': get_percentile(latencies, 50) if latencies else 0,
+        'p99_ms': get_percentile(latencies, 99) if latencies else 0,
+    })
+
+
+def request_wsgi(application, url: str, headers: dict = None) -> tuple:
+    """
+    Call WSGI application like a WSGI server does.
+    :params application: WSGI callable.
+    :params url: path with query string.
+    :params headers: extra request headers in environ format, e.g. HTTP_IF_NONE_MATCH.
+    :return: tuple of status code and latency in ms.
+    """
+    path, _, query_string = url.partition('?')
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query_string, **(headers or {})}
+    setup_testing_defaults(environ)
+    statuses = []
+
+    started_at = time.perf_counter()
+    result = application(environ, lambda status, response_headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(statuses[0].split()[0]), (time.perf_counter() - started_at) * 1000
+
+
+async def request_asgi(application, url: str, headers: dict = None) -> tuple:
+    """
+    Call ASGI application like an ASGI server does.
+    :params application: ASGI callable.
+    :params url: path with query string.
+    :params headers: extra request headers, e.g. {'if-none-match': etag}.
+    :return: tuple of status code and latency in ms.
+    """
+    split_url = urlsplit(url)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': split_url.path,
+        'raw_path': split_url.path.encode(),
+        'query_string': split_url.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')] + [
+            (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    started_at = time.perf_counter()
+    await application(scope, receive, send)
+    return messages[0]['status'], (time.perf_counter() - started_at) * 1000
@@ -0,0 +1,83 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_lock_key(key: str) -> str:
+    return f'{key}:lock'
+
+
+def is_refresh_due(expires_at: float, compute_duration: float) -> bool:
+    """
+    Decide whether the entry should be recomputed now.
+    Entries that are slow to compute get refreshed a bit earlier, at random, so workers don't
+    expire them all at once.
+    :params expires_at: timestamp when the entry stops being fresh.
+    :params compute_duration: seconds the entry took to compute.
+    :return: True if the entry is stale or picked for early refresh.
+    """
+    early_by = -compute_duration * settings.CACHE_EARLY_REFRESH_BETA * math.log(1 - random.random())
+    return time.time() + early_by >= expires_at
+
+
+def compute_and_store(key: str, compute, timeout: int):
+    started_at = time.perf_counter()
+    value = compute()
+    compute_duration = time.perf_counter() - started_at
+    entry = (value, time.time() + timeout, compute_duration)
+    cache.set(key, entry, timeout + settings.CACHE_STALE_TIMEOUT)
+    return value
+
+
+def get_or_compute(key: str, compute, timeout: int, refresh: bool = False):
+    """
+    Get value from cache, computing it in one worker at a time.
+    The worker that takes the lease recomputes the value, others keep serving the stale one.
+    If there is no value at all, others wait for the lease holder instead of computing it too.
+    :params key: cache key.
+    :params compute: function without arguments that returns the value.
+    :params timeout: seconds the value is fresh, after that it is served stale for CACHE_STALE_TIMEOUT.
+    :params refresh: recompute the value even if it is fresh, e.g. when warming cache.
+    :return: cached or computed value.
+    """
+    entry = cache.get(key)
+    if entry is not None and not refresh:
+        value, expires_at, compute_duration = entry
+        if not is_refresh_due(expires_at, compute_duration):
+            return value
+
+    lock_key = get_lock_key(key)
+    has_lease = cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT)
+    if not has_lease and not refresh:
+        if entry is not None:
+            return entry[0]
+        entry = wait_for_entry(key, lock_key)
+        if entry is not None:
+            return entry[0]
+
+    try:
+        return compute_and_store(key, compute, timeout)
+    finally:
+        if has_lease:
+            cache.delete(lock_key)
+
+
+def wait_for_entry(key: str, lock_key: str):
+    """
+    Wait while other worker holds the lease and computes the value.
+    :return: cache entry or None if the lease expired or was released without value.
+    """
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(lock_key) is None:
+            return None
+    return None
@@ -0,0 +1,45 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, router
+from django.shortcuts import render
+
+from blog.models import Post
+
+db_executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix='blog-db')
+
+
+def run_with_fresh_connections(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_query(func, *args, **kwargs):
+    """
+    Run blocking ORM code in the bounded pool of database threads.
+    Connections of the pool threads follow CONN_MAX_AGE like the ones of request threads.
+    :params func: function that makes queries.
+    :return: result of the function.
+    """
+    run = sync_to_async(run_with_fresh_connections, thread_sensitive=False, executor=db_executor)
+    return await run(func, *args, **kwargs)
+
+
+async def gather_queries(*funcs) -> list:
+    """
+    Run independent groups of queries concurrently.
+    The read database is chosen before, so all groups read the same replica.
+    :params funcs: functions without arguments, each makes its own queries.
+    :return: list of results in the order of functions.
+    """
+    router.db_for_read(Post)
+    return await asyncio.gather(*(run_query(func) for func in funcs))
+
+
+async def render_async(request, template_name: str, context: dict):
+    return await run_query(render, request, template_name, context)
@@ -0,0 +1,150 @@
+from calendar import timegm
+from functools import wraps
+from hashlib import md5
+
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from blog.concurrency import run_query
+from blog.models import Comment, Post, Tag
+from blog.page_cache import get_feeds_group, get_group_version, get_post_group, get_tag_group
+
+
+def get_post_state(request, slug: str):
+    """
+    Fetch cheap post validator data once per request.
+    :params request: current request, used to memoize the result.
+    :params slug: post's slug.
+    :return: dict with post's counters and dates or None if post doesn't exist.
+    """
+    if not hasattr(request, '_post_state'):
+        last_comments = Comment.objects.filter(post_id=OuterRef('pk')).order_by('-published_at').values('published_at')
+        post_states = Post.objects.filter(slug=slug).order_by().annotate(
+            last_comment_at=Subquery(last_comments[:1]),
+        ).values('id', 'published_at', 'likes_count', 'comments_count', 'last_comment_at')[:1]
+        request._post_state = post_states[0] if post_states else None
+    return request._post_state
+
+
+def get_tag_state(request, tag_title: str):
+    """
+    Fetch cheap tag validator data once per request.
+    :params request: current request, used to memoize the result.
+    :params tag_title: tag's title.
+    :return: dict with tag's counter and latest post date or None if tag doesn't exist.
+    """
+    if not hasattr(request, '_tag_state'):
+        tag_states = Tag.objects.filter(title=tag_title).order_by().values('id', 'posts_count').annotate(
+            last_post_at=Max('posts__published_at'),
+        )[:1]
+        request._tag_state = tag_states[0] if tag_states else None
+    return request._tag_state
+
+
+def make_etag(*parts) -> str:
+    return md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def post_last_modified(request, slug: str):
+    post_state = get_post_state(request, slug)
+    if not post_state:
+        return None
+    return max(filter(None, [post_state['published_at'], post_state['last_comment_at']]))
+
+
+def get_viewer_state(request, post_id: int) -> tuple:
+    """
+    Describe the viewer for post validators, logged in users see their own like button.
+    :params request: current request.
+    :params post_id: id of the post.
+    :return: tuple of user id and whether the user liked the post, empty for anonymous readers.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return ()
+    is_liked = Post.likes.through.objects.filter(post_id=post_id, user_id=user.id).exists()
+    return user.id, is_liked
+
+
+def post_etag(request, slug: str):
+    post_state = get_post_state(request, slug)
+    if not post_state:
+        return None
+    return make_etag(
+        post_state['id'],
+        post_last_modified(request, slug).isoformat(),
+        post_state['likes_count'],
+        post_state['comments_count'],
+        get_group_version(get_post_group(slug)),
+        *get_viewer_state(request, post_state['id']),
+    )
+
+
+def tag_last_modified(request, tag_title: str, **kwargs):
+    tag_state = get_tag_state(request, tag_title)
+    if not tag_state:
+        return None
+    return tag_state['last_post_at']
+
+
+def tag_etag(request, tag_title: str, **kwargs):
+    tag_state = get_tag_state(request, tag_title)
+    if not tag_state:
+        return None
+    return make_etag(
+        tag_state['id'],
+        tag_state['last_post_at'],
+        tag_state['posts_count'],
+        get_group_version(get_tag_group(tag_title)),
+    )
+
+
+def feeds_etag(request, **kwargs):
+    return make_etag('feeds', get_group_version(get_feeds_group()))
+
+
+def group_etag(get_group):
+    """
+    Make ETag function for views whose output changes with cached pages group, e.g. API responses.
+    Validation costs no queries, only a cache read.
+    :params get_group: function that takes view kwargs and returns pages group name.
+    :return: function that takes request and view kwargs and returns ETag.
+    """
+    def etag_func(request, *args, **kwargs):
+        return make_etag(request.get_full_path(), get_group_version(get_group(**kwargs)))
+    return etag_func
+
+
+def async_condition(etag_func, last_modified_func):
+    """
+    Version of django.views.decorators.http.condition for async views.
+    Validators are computed in a database thread, the view runs only if the client's copy is stale.
+    :params etag_func: function that takes view arguments and returns ETag or None.
+    :params last_modified_func: function that takes view arguments and returns datetime or None.
+    :return: view decorator.
+    """
+    def decorator(view):
+        def get_validators(request, *args, **kwargs):
+            etag = etag_func(request, *args, **kwargs)
+            last_modified = last_modified_func(request, *args, **kwargs)
+            return (
+                quote_etag(etag) if etag is not None else None,
+                timegm(last_modified.utctimetuple()) if last_modified else None,
+            )
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            etag, last_modified = await run_query(get_validators, request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.setdefault('ETag', etag)
+            return response
+        return wrapper
+    return decorator
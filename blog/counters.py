@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from blog.models import ArchiveMonth, Comment, Post, Tag
+
+
+def count_rows_subquery(queryset, field_name: str) -> Coalesce:
+    """
+    Build correlated subquery that counts related rows for outer object.
+    :params queryset: rows to count, e.g. through table of M2M relation.
+    :params field_name: name of the column pointing to outer object.
+    :return: expression with rows amount, 0 if there are no rows.
+    """
+    rows_amount = queryset.filter(**{field_name: OuterRef('pk')}).order_by().values(field_name). \
+        annotate(amount=Count('*')).values('amount')
+    return Coalesce(Subquery(rows_amount, output_field=IntegerField()), 0)
+
+
+def refresh_likes_count(post_ids):
+    Post.objects.filter(id__in=post_ids).update(
+        likes_count=count_rows_subquery(Post.likes.through.objects.all(), 'post_id'))
+
+
+def refresh_comments_count(post_ids):
+    Post.objects.filter(id__in=post_ids).update(
+        comments_count=count_rows_subquery(Comment.objects.all(), 'post_id'))
+
+
+def refresh_posts_count(tag_ids):
+    Tag.objects.filter(id__in=tag_ids).update(
+        posts_count=count_rows_subquery(Post.tags.through.objects.all(), 'tag_id'))
+
+
+def increment_likes_count(post_ids, amount: int = 1):
+    Post.objects.filter(id__in=post_ids).update(likes_count=F('likes_count') + amount)
+
+
+def increment_comments_count(post_ids, amount: int = 1):
+    Post.objects.filter(id__in=post_ids).update(comments_count=F('comments_count') + amount)
+
+
+def increment_posts_count(tag_ids, amount: int = 1):
+    Tag.objects.filter(id__in=tag_ids).update(posts_count=F('posts_count') + amount)
+
+
+def get_archive_month(published_at) -> tuple:
+    """
+    Find month of archive the post belongs to.
+    :params published_at: publication date of the post.
+    :return: tuple of year and month in the current time zone.
+    """
+    published_at = timezone.localtime(published_at)
+    return published_at.year, published_at.month
+
+
+def increment_archive_month(year: int, month: int, amount: int = 1):
+    ArchiveMonth.objects.get_or_create(year=year, month=month)
+    ArchiveMonth.objects.filter(year=year, month=month).update(posts_count=F('posts_count') + amount)
+
+
+def refresh_archive_months(months):
+    """
+    Recount posts of archive months, months without posts are removed.
+    Every month is counted by range of publication dates, so only its posts are read.
+    :params months: tuples of year and month.
+    """
+    for year, month in set(months):
+        posts_count = Post.objects.filter_by_month(year, month).count()
+        if posts_count:
+            ArchiveMonth.objects.update_or_create(year=year, month=month, defaults={'posts_count': posts_count})
+        else:
+            ArchiveMonth.objects.filter(year=year, month=month).delete()
+
+
+def rebuild_archive_months():
+    """Recount posts of all archive months with one pass over posts, e.g. after bulk import."""
+    months = Post.objects.order_by().annotate(month=TruncMonth('published_at')).values('month').annotate(
+        posts_count=Count('*'),
+    )
+    with transaction.atomic():
+        ArchiveMonth.objects.all().delete()
+        ArchiveMonth.objects.bulk_create([
+            ArchiveMonth(year=month['month'].year, month=month['month'].month, posts_count=month['posts_count'])
+            for month in months
+        ])
@@ -0,0 +1,60 @@
+import csv
+import json
+import os
+
+POST_FIELDS = ['slug', 'title', 'text', 'image', 'published_at', 'author', 'tags']
+COMMENT_FIELDS = ['post', 'author', 'text', 'published_at']
+LIKE_FIELDS = ['post', 'user']
+TAGS_SEPARATOR = '|'
+FORMATS = ('jsonl', 'csv')
+
+
+def get_file_path(directory: str, entity: str, file_format: str) -> str:
+    return os.path.join(directory, f'{entity}.{file_format}')
+
+
+def write_records(file_path: str, file_format: str, fields: list, records):
+    """
+    Stream records into JSON Lines or CSV file.
+    :params file_path: path of the file to write.
+    :params file_format: 'jsonl' or 'csv'.
+    :params fields: names of the record fields.
+    :params records: iterable of dicts.
+    :return: amount of written records.
+    """
+    records_amount = 0
+    with open(file_path, 'w', encoding='utf-8', newline='') as file:
+        if file_format == 'csv':
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+        for record in records:
+            if file_format == 'csv':
+                if 'tags' in record:
+                    record = {**record, 'tags': TAGS_SEPARATOR.join(record['tags'])}
+                writer.writerow(record)
+            else:
+                file.write(json.dumps(record, ensure_ascii=False, default=str))
+                file.write('\n')
+            records_amount += 1
+    return records_amount
+
+
+def read_records(file_path: str, file_format: str):
+    """
+    Stream records from JSON Lines or CSV file, missing file gives no records.
+    :params file_path: path of the file to read.
+    :params file_format: 'jsonl' or 'csv'.
+    :return: generator of dicts.
+    """
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, encoding='utf-8', newline='') as file:
+        if file_format == 'csv':
+            for record in csv.DictReader(file):
+                if 'tags' in record:
+                    record['tags'] = [title for title in record['tags'].split(TAGS_SEPARATOR) if title]
+                yield record
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
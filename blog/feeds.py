@@ -0,0 +1,172 @@
+import glob
+import os
+import tempfile
+from itertools import chain
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.http import Http404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+
+from blog.models import Post
+from blog.page_cache import make_hash
+from blog.serializers import TEASER_LENGTH
+
+FEED_TITLE = 'Sensive Blog'
+FEED_ITEMS_AMOUNT = 50
+SITEMAP_NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+ATOM_NAMESPACE = 'http://www.w3.org/2005/Atom'
+ROWS_CHUNK_SIZE = 2000
+
+
+def get_cached_file_path(name: str, version) -> str:
+    return os.path.join(settings.FEED_CACHE_DIR, f'{make_hash(name)}.{version}.xml')
+
+
+def get_file_version(file_path: str) -> int:
+    return int(file_path.rsplit('.', 2)[-2])
+
+
+def open_cached_file(name: str, version: int, chunks):
+    """
+    Open generated document from the cache folder, the document is written chunk by chunk, so it is never
+    kept in memory whole. Documents of older versions with the same name are removed after the document
+    is opened, so requests that already got a file never lose it.
+    :params name: name of the document, e.g. absolute url.
+    :params version: version of data the document is made of.
+    :params chunks: iterable of document parts.
+    :return: file opened for binary reading.
+    """
+    file_path = get_cached_file_path(name, version)
+    try:
+        return open(file_path, 'rb')
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(settings.FEED_CACHE_DIR, exist_ok=True)
+    file_descriptor, temp_path = tempfile.mkstemp(dir=settings.FEED_CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'w', encoding='utf-8') as temp_file:
+            for chunk in chunks:
+                temp_file.write(chunk)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    try:
+        cached_file = open(file_path, 'rb')
+    except FileNotFoundError:
+        # a newer version was written and removed this one meanwhile
+        newest_path = max(glob.glob(get_cached_file_path(name, '*')), key=get_file_version)
+        return open(newest_path, 'rb')
+
+    for outdated_path in glob.glob(get_cached_file_path(name, '*')):
+        if get_file_version(outdated_path) < version:
+            try:
+                os.remove(outdated_path)
+            except FileNotFoundError:
+                pass
+    return cached_file
+
+
+def generate_sitemap_index(base_url: str):
+    shards_amount = max(1, -(-Post.objects.count() // settings.SITEMAP_SHARD_SIZE))
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n'
+    for shard in range(1, shards_amount + 1):
+        shard_url = base_url + reverse('sitemap_shard', kwargs={'shard': shard})
+        yield f'<sitemap><loc>{escape(shard_url)}</loc></sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def generate_sitemap_shard(base_url: str, shard: int):
+    """
+    Generate sitemap with posts of the shard, rows are read in chunks.
+    Shards split posts ordered by id, the first one also lists the index page.
+    :params base_url: scheme and host of the site.
+    :params shard: number of the shard, from 1.
+    :raises Http404: if the shard has no posts.
+    """
+    shard_size = settings.SITEMAP_SHARD_SIZE
+    posts = Post.objects.order_by('id').values_list('slug', 'published_at')
+    if shard > 1:
+        first_ids = Post.objects.order_by('id').values_list('id', flat=True)[(shard - 1) * shard_size:][:1]
+        if not first_ids:
+            raise Http404('Sitemap not found')
+        posts = posts.filter(id__gte=first_ids[0])
+
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NAMESPACE}">\n'
+    if shard == 1:
+        yield f"<url><loc>{escape(base_url + reverse('index'))}</loc></url>\n"
+    for slug, published_at in posts[:shard_size].iterator(chunk_size=ROWS_CHUNK_SIZE):
+        post_url = base_url + reverse('post_detail', kwargs={'slug': slug})
+        yield f'<url><loc>{escape(post_url)}</loc><lastmod>{published_at.date().isoformat()}</lastmod></url>\n'
+    yield '</urlset>\n'
+
+
+def select_feed_items(posts):
+    posts = posts.order_by('-published_at', '-id').values_list(
+        'title',
+        'slug',
+        'published_at',
+        F('author__username'),
+        Substr('text', 1, TEASER_LENGTH),
+    )
+    return posts[:FEED_ITEMS_AMOUNT].iterator(chunk_size=ROWS_CHUNK_SIZE)
+
+
+def generate_rss_feed(base_url: str, title: str, link: str, posts):
+    """
+    Generate RSS 2.0 feed of the latest posts.
+    :params base_url: scheme and host of the site.
+    :params title: title of the feed.
+    :params link: path of the page the feed follows.
+    :params posts: posts of the feed.
+    """
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+        f'<title>{escape(title)}</title><link>{escape(base_url + link)}</link>'
+        f'<description>{escape(title)}</description>\n'
+    )
+    for post_title, slug, published_at, author, teaser in select_feed_items(posts):
+        post_url = escape(base_url + reverse('post_detail', kwargs={'slug': slug}))
+        yield (
+            f'<item><title>{escape(post_title)}</title><link>{post_url}</link>'
+            f'<guid isPermaLink="true">{post_url}</guid><pubDate>{rfc2822_date(published_at)}</pubDate>'
+            f'<description>{escape(teaser)}…</description></item>\n'
+        )
+    yield '</channel></rss>\n'
+
+
+def generate_atom_feed(base_url: str, title: str, link: str, posts, feed_url: str):
+    """
+    Generate Atom feed of the latest posts, the feed is updated when its newest post is published.
+    :params base_url: scheme and host of the site.
+    :params title: title of the feed.
+    :params link: path of the page the feed follows.
+    :params posts: posts of the feed.
+    :params feed_url: absolute url of the feed itself.
+    """
+    items = select_feed_items(posts)
+    newest_item = next(items, None)
+    updated_at = newest_item[2] if newest_item else timezone.now()
+    yield (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="{ATOM_NAMESPACE}">'
+        f'<title>{escape(title)}</title><link rel="alternate" href={quoteattr(base_url + link)}/>'
+        f'<link rel="self" href={quoteattr(feed_url)}/><id>{escape(feed_url)}</id>'
+        f'<updated>{rfc3339_date(updated_at)}</updated>\n'
+    )
+    if newest_item:
+        items = chain([newest_item], items)
+    for post_title, slug, published_at, author, teaser in items:
+        post_url = base_url + reverse('post_detail', kwargs={'slug': slug})
+        yield (
+            f'<entry><title>{escape(post_title)}</title><link href={quoteattr(post_url)}/><id>{escape(post_url)}</id>'
+            f'<published>{rfc3339_date(published_at)}</published><updated>{rfc3339_date(published_at)}</updated>'
+            f'<author><name>{escape(author)}</name></author><summary>{escape(teaser)}…</summary></entry>\n'
+        )
+    yield '</feed>\n'
@@ -0,0 +1,108 @@
+import atexit
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from blog.models import Post
+from blog.page_cache import purge_posts_pages
+from blog.related import queue_related_posts_refresh
+from blog.sidebar import invalidate_most_popular_posts
+
+
+class LikesCounterBuffer:
+    """Per-process buffer of likes counter changes, applied to the database in one statement."""
+
+    def __init__(self):
+        self.deltas = Counter()
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def add(self, post_id: int, delta: int):
+        """
+        Buffer change of post's likes counter and schedule flush if it isn't scheduled yet.
+        :params post_id: id of liked or unliked post.
+        :params delta: change of the counter.
+        """
+        with self.lock:
+            self.deltas[post_id] += delta
+            if self.timer is None:
+                self.timer = threading.Timer(settings.LIKES_FLUSH_INTERVAL, self.flush_in_thread)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def get_delta(self, post_id: int) -> int:
+        with self.lock:
+            return self.deltas[post_id]
+
+    def flush(self) -> int:
+        """
+        Apply buffered changes in one transaction with F() update.
+        :return: amount of updated posts.
+        """
+        with self.lock:
+            deltas = {post_id: delta for post_id, delta in self.deltas.items() if delta}
+            self.deltas = Counter()
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not deltas:
+            return 0
+
+        delta_for_post = Case(
+            *[When(id=post_id, then=Value(delta)) for post_id, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        with transaction.atomic():
+            Post.objects.filter(id__in=deltas).update(likes_count=Greatest(F('likes_count') + delta_for_post, 0))
+
+        invalidate_most_popular_posts()
+        purge_posts_pages(deltas, with_tags=False)
+        queue_related_posts_refresh(deltas)
+        return len(deltas)
+
+    def flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+
+likes_buffer = LikesCounterBuffer()
+atexit.register(likes_buffer.flush)
+
+
+def like_post(post_id: int, user_id: int) -> bool:
+    """
+    Write like row without touching post's counter, counter change goes to the buffer.
+    Cached pages of the post are purged at once, so the liker doesn't see the old button.
+    :params post_id: id of liked post.
+    :params user_id: id of user who likes.
+    :return: True if like is new, False if user already liked the post.
+    """
+    try:
+        with transaction.atomic():
+            Post.likes.through.objects.create(post_id=post_id, user_id=user_id)
+    except IntegrityError:
+        return False
+    likes_buffer.add(post_id, 1)
+    purge_posts_pages([post_id], with_tags=False)
+    return True
+
+
+def unlike_post(post_id: int, user_id: int) -> bool:
+    """
+    Remove like row without touching post's counter, counter change goes to the buffer.
+    :params post_id: id of unliked post.
+    :params user_id: id of user who unlikes.
+    :return: True if like was removed, False if there was no like.
+    """
+    deleted_amount, _ = Post.likes.through.objects.filter(post_id=post_id, user_id=user_id).delete()
+    if deleted_amount:
+        likes_buffer.add(post_id, -1)
+        purge_posts_pages([post_id], with_tags=False)
+    return bool(deleted_amount)
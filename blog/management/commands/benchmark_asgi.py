@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.benchmarking import get_benchmark_urls, request_asgi, request_wsgi
+from blog.query_stats import get_percentile
+
+DUMMY_CACHE = 'django.core.cache.backends.dummy.DummyCache'
+
+
+class Command(BaseCommand):
+    help = 'Compare tail latency of concurrent requests served by the WSGI application and by the ASGI one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=100, help='Measured requests per url')
+        parser.add_argument('--warm', action='store_true', help='Keep page and sidebar caches enabled')
+        parser.add_argument('--server', choices=('wsgi', 'asgi'), help='Measure one application in this process')
+
+    def handle(self, *args, **options):
+        if options['server']:
+            results = self.measure(options['server'], options)
+            self.stdout.write(json.dumps(results))
+            return
+
+        results = {server: self.run_server(server, options) for server in ('wsgi', 'asgi')}
+        for label, wsgi_result in results['wsgi'].items():
+            asgi_result = results['asgi'][label]
+            self.stdout.write(f"{label} {wsgi_result['url']}:")
+            for server, result in (('wsgi', wsgi_result), ('asgi', asgi_result)):
+                self.stdout.write(
+                    f"  {server} [{result['status']}]: p50 {result['p50_ms']} ms, "
+                    f"p90 {result['p90_ms']} ms, p99 {result['p99_ms']} ms"
+                )
+            change = (asgi_result['p99_ms'] - wsgi_result['p99_ms']) / wsgi_result['p99_ms'] * 100
+            self.stdout.write(f'  p99 change: {change:+.1f}%')
+
+    def run_server(self, server: str, options: dict) -> dict:
+        """
+        Run the benchmark of one application in a child process, because views are chosen when urls are loaded.
+        """
+        env = {
+            **os.environ,
+            'ASYNC_VIEWS': str(server == 'asgi'),
+            'DEBUG': 'False',
+            'ALLOWED_HOSTS': '*',
+        }
+        if not options['warm']:
+            env.update({'CACHE_BACKEND': DUMMY_CACHE, 'PAGE_CACHE_BACKEND': DUMMY_CACHE})
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_asgi',
+            '--server', server,
+            '--concurrency', str(options['concurrency']),
+            '--requests', str(options['requests']),
+        ]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'{server} benchmark failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.splitlines()[-1])
+
+    def measure(self, server: str, options: dict) -> dict:
+        if server == 'asgi':
+            from sensive_blog.asgi import application
+        else:
+            from sensive_blog.wsgi import application
+
+        results = {}
+        for label, url in get_benchmark_urls().items():
+            if server == 'asgi':
+                responses = asyncio.run(self.send_asgi_requests(application, url, options))
+            else:
+                responses = self.send_wsgi_requests(application, url, options)
+            latencies = sorted(latency for _, latency in responses)
+            results[label] = {
+                'url': url,
+                'status': responses[-1][0],
+                'p50_ms': round(get_percentile(latencies, 50), 2),
+                'p90_ms': round(get_percentile(latencies, 90), 2),
+                'p99_ms': round(get_percentile(latencies, 99), 2),
+            }
+        return results
+
+    def send_wsgi_requests(self, application, url: str, options: dict) -> list:
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            return list(executor.map(lambda _: request_wsgi(application, url), range(options['requests'])))
+
+    async def send_asgi_requests(self, application, url: str, options: dict) -> list:
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def send_request():
+            async with semaphore:
+                return await request_asgi(application, url)
+
+        return await asyncio.gather(*(send_request() for _ in range(options['requests'])))
@@ -0,0 +1,75 @@
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.query_stats import QueryCollector
+from blog.serializers import select_post_cards, serialize_post, serialize_post_cards
+
+
+def serialize_with_models(amount: int) -> list:
+    posts = Post.objects.prefetch_related('author').prefetch_tags()[:amount]
+    return [serialize_post(post) for post in posts]
+
+
+def serialize_with_values(amount: int) -> list:
+    return serialize_post_cards(select_post_cards(Post.objects.all())[:amount])
+
+
+SERIALIZERS = {
+    'models': serialize_with_models,
+    'values': serialize_with_values,
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare time, allocations and queries of serializing post cards from models and from values() rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=1000, help='Post cards serialized per run')
+        parser.add_argument('--repeat', type=int, default=10, help='Measured runs per serializer')
+
+    def handle(self, *args, **options):
+        amount = options['cards']
+        if Post.objects.count() < amount:
+            self.stderr.write(f'Database has less than {amount} posts, run seed_blog first')
+            return
+
+        if serialize_with_models(amount) != serialize_with_values(amount):
+            self.stderr.write('Serializers give different output')
+            return
+
+        results = {name: self.benchmark(serializer, amount, options['repeat']) for name, serializer in SERIALIZERS.items()}
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}: {result['mean_ms']} ms per {amount} cards, "
+                f"peak {result['peak_memory_kb']} KB allocated, {result['queries']} queries"
+            )
+        models_result, values_result = results['models'], results['values']
+        self.stdout.write(
+            f"values() is {models_result['mean_ms'] / values_result['mean_ms']:.1f}x faster "
+            f"and allocates {models_result['peak_memory_kb'] / values_result['peak_memory_kb']:.1f}x less memory"
+        )
+
+    def benchmark(self, serializer, amount: int, repeat: int) -> dict:
+        serializer(amount)
+        durations = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            serializer(amount)
+            durations.append((time.perf_counter() - started_at) * 1000)
+
+        collector = QueryCollector()
+        tracemalloc.start()
+        with collector.watch():
+            serializer(amount)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'mean_ms': round(statistics.mean(durations), 2),
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+            'queries': collector.queries_amount,
+        }
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.benchmarking import run_sqlite_worker
+from blog.models import Post
+from blog.sqlite import copy_sqlite_database
+
+PROFILES = {
+    'default': {
+        'journal_mode': 'DELETE',
+        'production_mode': False,
+        'conn_max_age': 0,
+        'timeout': 5,
+    },
+    'production': {
+        'journal_mode': 'WAL',
+        'production_mode': True,
+        'conn_max_age': 600,
+        'timeout': 20,
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput of concurrent readers and writers with default and production SQLite settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Reading worker processes')
+        parser.add_argument('--writers', type=int, default=1, help='Writing worker processes')
+        parser.add_argument('--duration', type=float, default=5, help='Seconds to run every profile')
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+
+    def handle(self, *args, **options):
+        post_ids = list(Post.objects.values_list('id', flat=True))
+        user_ids = list(User.objects.values_list('id', flat=True))
+        if not post_ids or not user_ids:
+            self.stderr.write('Database has no posts or users, run seed_blog first')
+            return
+
+        source_path = settings.DATABASES['default']['NAME']
+        for profile_name in options['profiles']:
+            with tempfile.TemporaryDirectory() as directory:
+                profile = {**PROFILES[profile_name], 'name': os.path.join(directory, 'benchmark.sqlite3')}
+                copy_sqlite_database(source_path, profile['name'], profile['journal_mode'])
+                results = self.run_workers(profile, post_ids, user_ids, options)
+            self.print_results(profile_name, results, options['duration'])
+
+    def run_workers(self, profile: dict, post_ids: list, user_ids: list, options: dict) -> list:
+        roles = ['reader'] * options['readers'] + ['writer'] * options['writers']
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(len(roles))
+        results = context.Queue()
+
+        connections.close_all()
+        workers = [
+            context.Process(
+                target=run_sqlite_worker,
+                args=(role, profile, post_ids, user_ids, options['duration'], barrier, results),
+            )
+            for role in roles
+        ]
+        for worker in workers:
+            worker.start()
+        worker_results = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        return worker_results
+
+    def print_results(self, profile_name: str, results: list, duration: float):
+        self.stdout.write(f'{profile_name}:')
+        for role in ('reader', 'writer'):
+            role_results = [result for result in results if result['role'] == role]
+            if not role_results:
+                continue
+            operations = sum(result['operations'] for result in role_results)
+            errors = sum(result['errors'] for result in role_results)
+            p50 = max(result['p50_ms'] for result in role_results)
+            p99 = max(result['p99_ms'] for result in role_results)
+            self.stdout.write(
+                f'  {len(role_results)} {role}s: {operations / duration:.1f} ops/s, '
+                f'{errors} errors, worst p50 {p50:.2f} ms, worst p99 {p99:.2f} ms'
+            )
@@ -0,0 +1,113 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog.models import Post, Tag
+from blog.serializers import serialize_post_details
+from blog.sidebar import get_archive_months, get_most_popular_posts, get_popular_tags
+from blog.views import (
+    get_comments_page,
+    get_index_posts,
+    get_post,
+    get_post_tags,
+    get_related_posts_cards,
+    get_tag_posts,
+)
+
+MODES = {
+    'plain': {'cached_loader': False, 'fragments': False},
+    'cached_loader': {'cached_loader': True, 'fragments': False},
+    'cached_loader_and_fragments': {'cached_loader': True, 'fragments': True},
+}
+
+
+def get_sidebar_context() -> dict:
+    return {
+        'most_popular_posts': get_most_popular_posts(),
+        'popular_tags': get_popular_tags(),
+        'archive_months': get_archive_months(),
+    }
+
+
+def get_pages() -> dict:
+    """
+    Build contexts of the heaviest pages the way views do, so only rendering is measured.
+    :return: dict with labels as keys and tuples of url, template name and context as values.
+    """
+    pages = {'index': (reverse('index'), 'index.html', {**get_sidebar_context(), **get_index_posts(1), 'page_number': 1})}
+
+    popular_tag = Tag.objects.get_popular_posts().only('title').first()
+    if popular_tag:
+        url = reverse('tag_filter', kwargs={'tag_title': popular_tag.title})
+        pages['tag_filter'] = (url, 'posts-list.html', {**get_sidebar_context(), **get_tag_posts(popular_tag.title)})
+
+    popular_post = Post.objects.order_by('-likes_count').only('slug').first()
+    if popular_post:
+        post = get_post(popular_post.slug)
+        comments_page = get_comments_page(post.id)
+        context = {
+            **get_sidebar_context(),
+            'post': serialize_post_details(post, get_post_tags(post), comments_page['comments']),
+            'is_liked': False,
+            'related_posts': get_related_posts_cards(post.id),
+            'next_comments_url': None,
+        }
+        pages['post_detail'] = (post.get_absolute_url(), 'post-details.html', context)
+    return pages
+
+
+def make_engine(cached_loader: bool) -> DjangoTemplates:
+    template_settings = settings.TEMPLATES[0]
+    loaders = settings.TEMPLATE_LOADERS
+    if cached_loader:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    return DjangoTemplates({
+        'NAME': 'benchmark',
+        'DIRS': template_settings['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': {**template_settings['OPTIONS'], 'loaders': loaders},
+    })
+
+
+class Command(BaseCommand):
+    help = 'Compare render time of pages without caches, with cached template loader and with fragments cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Measured renders per page and mode')
+
+    def handle(self, *args, **options):
+        pages = get_pages()
+        request_factory = RequestFactory()
+        results = {}
+        for mode, mode_options in MODES.items():
+            engine = make_engine(mode_options['cached_loader'])
+            caches_settings = dict(settings.CACHES)
+            if not mode_options['fragments']:
+                caches_settings['template_fragments'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+            with override_settings(CACHES=caches_settings):
+                for label, (url, template_name, context) in pages.items():
+                    request = request_factory.get(url)
+                    request.user = AnonymousUser()
+                    results[(mode, label)] = self.benchmark(engine, template_name, context, request, options['repeat'])
+
+        for label in pages:
+            plain_ms = results[('plain', label)]
+            report = ', '.join(f'{mode} {results[(mode, label)]} ms' for mode in MODES)
+            fastest_ms = results[('cached_loader_and_fragments', label)]
+            self.stdout.write(f'{label}: {report}, {plain_ms / fastest_ms:.1f}x faster with both')
+
+    def benchmark(self, engine: DjangoTemplates, template_name: str, context: dict, request, repeat: int) -> float:
+        engine.get_template(template_name).render(context, request)
+        durations = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            engine.get_template(template_name).render(context, request)
+            durations.append((time.perf_counter() - started_at) * 1000)
+        return round(statistics.mean(durations), 2)
@@ -0,0 +1,102 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from blog.benchmarking import clear_caches, get_benchmark_urls
+from blog.models import Post
+from blog.query_stats import QueryCollector, get_percentile
+
+
+class Command(BaseCommand):
+    help = 'Measure latency, queries and peak memory of the blog views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per url')
+        parser.add_argument('--warmup', type=int, default=3, help='Not measured requests per url')
+        parser.add_argument('--cold', action='store_true', help='Clear caches before every request')
+        parser.add_argument('--label', default='', help='Name of the run, e.g. commit hash')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--compare', help='JSON file of previous run to compare with')
+
+    def handle(self, *args, **options):
+        client = Client()
+        results = {}
+
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for label, url in get_benchmark_urls().items():
+                results[label] = self.benchmark_url(client, url, options)
+                self.print_result(label, results[label])
+
+        report = {
+            'label': options['label'],
+            'cold': options['cold'],
+            'posts': Post.objects.count(),
+            'views': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.print_comparison(json.load(file), report)
+
+    def benchmark_url(self, client: Client, url: str, options: dict) -> dict:
+        for _ in range(options['warmup']):
+            client.get(url)
+
+        latencies = []
+        queries = []
+        for _ in range(options['requests']):
+            if options['cold']:
+                clear_caches()
+            collector = QueryCollector()
+            started_at = time.perf_counter()
+            with collector.watch():
+                response = client.get(url)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+            queries.append(collector.queries_amount)
+
+        if options['cold']:
+            clear_caches()
+        tracemalloc.start()
+        client.get(url)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies.sort()
+        return {
+            'url': url,
+            'status': response.status_code,
+            'mean_ms': round(statistics.mean(latencies), 2),
+            'p50_ms': round(get_percentile(latencies, 50), 2),
+            'p90_ms': round(get_percentile(latencies, 90), 2),
+            'p99_ms': round(get_percentile(latencies, 99), 2),
+            'queries_per_request': round(statistics.mean(queries), 2),
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+        }
+
+    def print_result(self, label: str, result: dict):
+        self.stdout.write(
+            f"{label} {result['url']} [{result['status']}]: "
+            f"p50 {result['p50_ms']} ms, p90 {result['p90_ms']} ms, p99 {result['p99_ms']} ms, "
+            f"{result['queries_per_request']} queries, peak {result['peak_memory_kb']} KB"
+        )
+
+    def print_comparison(self, previous: dict, current: dict):
+        self.stdout.write(f"Compared with {previous.get('label') or 'previous run'}:")
+        for label, result in current['views'].items():
+            previous_result = previous['views'].get(label)
+            if not previous_result:
+                continue
+            changes = []
+            for metric in ('p50_ms', 'p99_ms', 'queries_per_request', 'peak_memory_kb'):
+                before, after = previous_result[metric], result[metric]
+                change = (after - before) / before * 100 if before else 0
+                changes.append(f'{metric} {before} -> {after} ({change:+.1f}%)')
+            self.stdout.write(f"{label}: {', '.join(changes)}")
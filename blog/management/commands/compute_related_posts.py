@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import RELATED_POSTS_AMOUNT, refresh_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Precompute related posts from shared tags and co-likes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute all posts, not only changed ones')
+        parser.add_argument('--amount', type=int, default=RELATED_POSTS_AMOUNT, help='Related posts per post')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        refreshed_amount = refresh_related_posts(options['full'], options['amount'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Related posts refreshed for {refreshed_amount} posts'))
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from blog.benchmarking import clear_caches, get_benchmark_urls
+from blog.routers import use_primary
+
+PLAN_WARNINGS = ('USE TEMP B-TREE',)
+
+
+class QueryRecorder:
+    """Execute wrapper that remembers every SELECT query with its params."""
+
+    def __init__(self):
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT') and not many:
+            self.queries.setdefault(sql, params)
+        return execute(sql, params, many, context)
+
+
+def find_plan_problems(plan_details: list) -> list:
+    """
+    Find full table scans and temporary B-trees in EXPLAIN QUERY PLAN output.
+    Scans of sqlite_master and sorting of full-text matches by rank can't use an index, so they are skipped.
+    :params plan_details: detail column of every plan row.
+    :return: plan rows that look like problems.
+    """
+    is_full_text_search = any('VIRTUAL TABLE' in detail for detail in plan_details)
+    problems = []
+    for detail in plan_details:
+        is_full_scan = detail.startswith('SCAN') and 'USING' not in detail and 'VIRTUAL TABLE' not in detail
+        if is_full_scan and detail != 'SCAN sqlite_master':
+            problems.append(detail)
+        elif any(warning in detail for warning in PLAN_WARNINGS) and not is_full_text_search:
+            problems.append(detail)
+    return problems
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN QUERY PLAN on every query the views issue and flag full scans and temp B-trees'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print plans of queries without problems')
+        parser.add_argument('--fail', action='store_true', help='Exit with error if any problem is found')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN audit supports only SQLite')
+
+        client = Client()
+        problems_amount = 0
+        with override_settings(ALLOWED_HOSTS=['*']), use_primary():
+            for label, url in get_benchmark_urls().items():
+                clear_caches()
+                recorder = QueryRecorder()
+                with connection.execute_wrapper(recorder):
+                    client.get(url)
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{label} {url}: {len(recorder.queries)} queries'))
+                for sql, params in recorder.queries.items():
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                        plan_details = [row[-1] for row in cursor.fetchall()]
+                    problems = find_plan_problems(plan_details)
+                    if problems or options['verbose_plans']:
+                        self.stdout.write(f'  {sql}')
+                        for detail in plan_details:
+                            style = self.style.ERROR if detail in problems else str
+                            self.stdout.write(style(f'    {detail}'))
+                    problems_amount += len(problems)
+
+        if problems_amount and options['fail']:
+            raise CommandError(f'{problems_amount} query plan problems found')
+        self.stdout.write(f'Query plan problems: {problems_amount}')
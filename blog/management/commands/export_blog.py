@@ -0,0 +1,70 @@
+import os
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from blog.batching import iterate_batches
+from blog.exchange import COMMENT_FIELDS, FORMATS, LIKE_FIELDS, POST_FIELDS, get_file_path, write_records
+from blog.models import Comment, Post
+
+
+def iterate_posts(chunk_size: int):
+    posts = Post.objects.order_by('id').values(
+        'id', 'slug', 'title', 'text', 'image', 'published_at', 'author__username',
+    ).iterator(chunk_size=chunk_size)
+    for batch in iterate_batches(posts, chunk_size):
+        post_tags = Post.tags.through.objects.filter(post_id__in=[post['id'] for post in batch]). \
+            order_by('tag__title').values_list('post_id', 'tag__title')
+        tags_for_post = defaultdict(list)
+        for post_id, tag_title in post_tags:
+            tags_for_post[post_id].append(tag_title)
+
+        for post in batch:
+            yield {
+                'slug': post['slug'],
+                'title': post['title'],
+                'text': post['text'],
+                'image': post['image'],
+                'published_at': post['published_at'].isoformat(),
+                'author': post['author__username'],
+                'tags': tags_for_post[post['id']],
+            }
+
+
+def iterate_comments(chunk_size: int):
+    comments = Comment.objects.order_by('id').values_list(
+        'post__slug', 'author__username', 'text', 'published_at',
+    ).iterator(chunk_size=chunk_size)
+    for post_slug, author, text, published_at in comments:
+        yield {'post': post_slug, 'author': author, 'text': text, 'published_at': published_at.isoformat()}
+
+
+def iterate_likes(chunk_size: int):
+    likes = Post.likes.through.objects.order_by('id').values_list(
+        'post__slug', 'user__username',
+    ).iterator(chunk_size=chunk_size)
+    for post_slug, username in likes:
+        yield {'post': post_slug, 'user': username}
+
+
+class Command(BaseCommand):
+    help = 'Export posts, comments and likes to JSON Lines or CSV files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory for posts, comments and likes files')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        directory, file_format, chunk_size = options['directory'], options['format'], options['chunk_size']
+        os.makedirs(directory, exist_ok=True)
+
+        exports = [
+            ('posts', POST_FIELDS, iterate_posts),
+            ('comments', COMMENT_FIELDS, iterate_comments),
+            ('likes', LIKE_FIELDS, iterate_likes),
+        ]
+        for entity, fields, iterate_records in exports:
+            file_path = get_file_path(directory, entity, file_format)
+            records_amount = write_records(file_path, file_format, fields, iterate_records(chunk_size))
+            self.stdout.write(f'{entity}: {records_amount} -> {file_path}')
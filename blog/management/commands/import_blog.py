@@ -0,0 +1,208 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from blog.batching import iterate_batches
+from blog.counters import (
+    get_archive_month,
+    refresh_archive_months,
+    refresh_comments_count,
+    refresh_likes_count,
+    refresh_posts_count,
+)
+from blog.exchange import FORMATS, get_file_path, read_records
+from blog.models import Comment, Post, Tag
+from blog.sidebar import invalidate_sidebar
+
+
+def get_user_ids(usernames) -> dict:
+    """
+    Map usernames to user ids, missing users are created without usable password.
+    :params usernames: usernames from one batch.
+    :return: dict with usernames as keys and ids as values.
+    """
+    usernames = set(usernames)
+    id_for_username = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+    missing_usernames = usernames - id_for_username.keys()
+    if missing_usernames:
+        User.objects.bulk_create([User(username=username, password='!') for username in missing_usernames])
+        id_for_username.update(User.objects.filter(username__in=missing_usernames).values_list('username', 'id'))
+    return id_for_username
+
+
+def get_post_ids(slugs) -> dict:
+    return dict(Post.objects.filter(slug__in=set(slugs)).values_list('slug', 'id'))
+
+
+def get_existing_comments(id_for_slug: dict, batch: list) -> set:
+    """
+    Find comments of the batch that are already in the database, e.g. imported by previous run.
+    :params id_for_slug: ids of the batch posts.
+    :params batch: comment records.
+    :return: set of (post id, author username, publication date, text) tuples.
+    """
+    existing_comments = Comment.objects.filter(
+        post_id__in={id_for_slug[record['post']] for record in batch},
+        published_at__in={parse_datetime(record['published_at']) for record in batch},
+    ).values_list('post_id', 'author__username', 'published_at', 'text')
+    return set(existing_comments)
+
+
+def make_unique_slug(slug: str, taken_slugs: set) -> str:
+    """
+    Add number suffix to the slug, so it is taken neither in the batch nor in the database.
+    :params slug: slug that is already taken.
+    :params taken_slugs: slugs of the batch, the new slug is added there.
+    :return: unique slug.
+    """
+    max_length = Post._meta.get_field('slug').max_length
+    number = 2
+    while True:
+        suffix = f'-{number}'
+        unique_slug = f'{slug[:max_length - len(suffix)]}{suffix}'
+        if unique_slug not in taken_slugs and not Post.objects.filter(slug=unique_slug).exists():
+            taken_slugs.add(unique_slug)
+            return unique_slug
+        number += 1
+
+
+class Command(BaseCommand):
+    help = 'Import posts, comments and likes from JSON Lines or CSV files made by export_blog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory with posts, comments and likes files')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--defer-rebuild',
+            action='store_true',
+            help='Recompute counters once after import instead of after every batch',
+        )
+
+    def handle(self, *args, **options):
+        directory, file_format = options['directory'], options['format']
+        self.batch_size = options['batch_size']
+        self.defer_rebuild = options['defer_rebuild']
+        self.id_for_tag_title = {title.lower(): tag_id for title, tag_id in Tag.objects.values_list('title', 'id')}
+
+        posts = read_records(get_file_path(directory, 'posts', file_format), file_format)
+        self.stdout.write(f'posts: {self.import_posts(posts)}')
+        comments = read_records(get_file_path(directory, 'comments', file_format), file_format)
+        self.stdout.write(f'comments: {self.import_comments(comments)}')
+        likes = read_records(get_file_path(directory, 'likes', file_format), file_format)
+        self.stdout.write(f'likes: {self.import_likes(likes)}')
+
+        if self.defer_rebuild:
+            call_command('recount_counters', batch_size=self.batch_size, stdout=self.stdout)
+        invalidate_sidebar()
+        caches['pages'].clear()
+        caches['template_fragments'].clear()
+        self.stdout.write(self.style.SUCCESS('Import finished'))
+
+    def get_tag_ids(self, titles) -> list:
+        missing_titles = {title.lower() for title in titles} - self.id_for_tag_title.keys()
+        if missing_titles:
+            Tag.objects.bulk_create([Tag(title=title) for title in missing_titles])
+            self.id_for_tag_title.update(
+                (title.lower(), tag_id)
+                for title, tag_id in Tag.objects.filter(title__in=missing_titles).values_list('title', 'id')
+            )
+        return [self.id_for_tag_title[title.lower()] for title in titles]
+
+    def make_slugs_unique(self, batch: list):
+        """Rename repeated slugs of the batch, comments and likes of such slug stay with its first post."""
+        taken_slugs = set()
+        for record in batch:
+            if record['slug'] in taken_slugs:
+                unique_slug = make_unique_slug(record['slug'], taken_slugs)
+                self.stderr.write(f"Slug {record['slug']} is repeated, the post is imported as {unique_slug}")
+                record['slug'] = unique_slug
+            taken_slugs.add(record['slug'])
+
+    def import_posts(self, records) -> int:
+        imported_amount = 0
+        touched_tag_ids = set()
+        touched_months = set()
+        for batch in iterate_batches(records, self.batch_size):
+            with transaction.atomic():
+                existing_slugs = get_post_ids(record['slug'] for record in batch).keys()
+                batch = [record for record in batch if record['slug'] not in existing_slugs]
+                self.make_slugs_unique(batch)
+                id_for_username = get_user_ids(record['author'] for record in batch)
+                Post.objects.bulk_create([
+                    Post(
+                        slug=record['slug'],
+                        title=record['title'],
+                        text=record['text'],
+                        image=record['image'],
+                        published_at=parse_datetime(record['published_at']),
+                        author_id=id_for_username[record['author']],
+                    )
+                    for record in batch
+                ])
+
+                id_for_slug = get_post_ids(record['slug'] for record in batch)
+                post_tags = [
+                    Post.tags.through(post_id=id_for_slug[record['slug']], tag_id=tag_id)
+                    for record in batch
+                    for tag_id in set(self.get_tag_ids(record['tags']))
+                ]
+                Post.tags.through.objects.bulk_create(post_tags, ignore_conflicts=True)
+            touched_tag_ids.update(post_tag.tag_id for post_tag in post_tags)
+            touched_months.update(get_archive_month(parse_datetime(record['published_at'])) for record in batch)
+            imported_amount += len(batch)
+
+        if not self.defer_rebuild:
+            refresh_posts_count(touched_tag_ids)
+            refresh_archive_months(touched_months)
+        return imported_amount
+
+    def import_comments(self, records) -> int:
+        imported_amount = 0
+        for batch in iterate_batches(records, self.batch_size):
+            with transaction.atomic():
+                id_for_slug = get_post_ids(record['post'] for record in batch)
+                batch = [record for record in batch if record['post'] in id_for_slug]
+                existing_comments = get_existing_comments(id_for_slug, batch)
+                batch = [
+                    record for record in batch
+                    if (
+                        id_for_slug[record['post']],
+                        record['author'],
+                        parse_datetime(record['published_at']),
+                        record['text'],
+                    ) not in existing_comments
+                ]
+                id_for_username = get_user_ids(record['author'] for record in batch)
+                Comment.objects.bulk_create([
+                    Comment(
+                        post_id=id_for_slug[record['post']],
+                        author_id=id_for_username[record['author']],
+                        text=record['text'],
+                        published_at=parse_datetime(record['published_at']),
+                    )
+                    for record in batch
+                ])
+                if not self.defer_rebuild:
+                    refresh_comments_count({id_for_slug[record['post']] for record in batch})
+            imported_amount += len(batch)
+        return imported_amount
+
+    def import_likes(self, records) -> int:
+        imported_amount = 0
+        for batch in iterate_batches(records, self.batch_size):
+            with transaction.atomic():
+                id_for_slug = get_post_ids(record['post'] for record in batch)
+                batch = [record for record in batch if record['post'] in id_for_slug]
+                id_for_username = get_user_ids(record['user'] for record in batch)
+                Post.likes.through.objects.bulk_create([
+                    Post.likes.through(post_id=id_for_slug[record['post']], user_id=id_for_username[record['user']])
+                    for record in batch
+                ], ignore_conflicts=True)
+                if not self.defer_rebuild:
+                    refresh_likes_count({id_for_slug[record['post']] for record in batch})
+            imported_amount += len(batch)
+        return imported_amount
@@ -0,0 +1,59 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from blog.batching import iterate_batches
+from blog.models import Post
+from blog.page_cache import purge_posts_pages
+from blog.sidebar import invalidate_sidebar
+from blog.thumbnails import make_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Make WebP and JPEG thumbnails of post images in parallel processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recreate thumbnails that already exist')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Processes that resize images')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['force']:
+            posts = posts.filter(image_width__isnull=True)
+        image_names = sorted(set(posts.order_by().values_list('image', flat=True)))
+        if not image_names:
+            self.stdout.write('No images without thumbnails')
+            return
+
+        connections.close_all()
+        names_for_width = defaultdict(list)
+        failed_amount = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(make_thumbnails, image_name, options['force']): image_name
+                for image_name in image_names
+            }
+            for future in as_completed(futures):
+                try:
+                    names_for_width[future.result()].append(futures[future])
+                except (OSError, ValueError) as error:
+                    failed_amount += 1
+                    self.stderr.write(f'{futures[future]}: {error}')
+
+        post_ids = []
+        with transaction.atomic():
+            for image_width, names in names_for_width.items():
+                for names_batch in iterate_batches(names, options['batch_size']):
+                    posts_batch = Post.objects.filter(image__in=names_batch)
+                    post_ids += posts_batch.values_list('id', flat=True)
+                    posts_batch.update(image_width=image_width)
+        for post_ids_batch in iterate_batches(post_ids, options['batch_size']):
+            purge_posts_pages(post_ids_batch)
+        invalidate_sidebar()
+
+        made_amount = len(image_names) - failed_amount
+        self.stdout.write(self.style.SUCCESS(f'Thumbnails made for {made_amount} images, {failed_amount} failed'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from blog.page_cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hits and misses of the anonymous page cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset counters after showing them')
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        requests_amount = stats['hits'] + stats['misses']
+        hit_ratio = stats['hits'] / requests_amount if requests_amount else 0
+        self.stdout.write(f"hits: {stats['hits']}, misses: {stats['misses']}, hit ratio: {hit_ratio:.1%}")
+
+        if options['reset']:
+            reset_stats()
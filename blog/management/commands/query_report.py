@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from blog.query_stats import flush_samples, get_report, reset_report
+
+
+class Command(BaseCommand):
+    help = 'Show per url name percentiles of SQL queries amount and DB time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Dump report as JSON')
+        parser.add_argument('--reset', action='store_true', help='Drop collected samples after showing them')
+
+    def handle(self, *args, **options):
+        flush_samples()
+        report = get_report()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            for url_name, stats in report.items():
+                queries, db_ms = stats['queries'], stats['db_ms']
+                self.stdout.write(
+                    f"{url_name}: {stats['requests']} requests, "
+                    f"queries p50/p90/p99 {queries['p50']}/{queries['p90']}/{queries['p99']}, "
+                    f"db ms p50/p90/p99 {db_ms['p50']}/{db_ms['p90']}/{db_ms['p99']}"
+                )
+
+        if options['reset']:
+            reset_report()
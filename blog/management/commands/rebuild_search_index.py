@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from blog.search import ensure_fts_index
+
+
+class Command(BaseCommand):
+    help = 'Create and refill SQLite FTS5 index of posts'
+
+    def handle(self, *args, **options):
+        if ensure_fts_index(rebuild=True):
+            self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
+        else:
+            self.stdout.write(self.style.WARNING('FTS5 is not available, search uses in-memory index'))
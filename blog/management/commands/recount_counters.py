@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.batching import iterate_id_batches
+from blog.counters import rebuild_archive_months, refresh_comments_count, refresh_likes_count, refresh_posts_count
+from blog.models import Post, Tag
+from blog.sidebar import invalidate_sidebar
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored likes, comments, posts-per-tag and posts-per-month counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Objects updated in one transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for post_ids in iterate_id_batches(Post.objects.all(), batch_size):
+            with transaction.atomic():
+                refresh_likes_count(post_ids)
+                refresh_comments_count(post_ids)
+
+        for tag_ids in iterate_id_batches(Tag.objects.all(), batch_size):
+            refresh_posts_count(tag_ids)
+
+        rebuild_archive_months()
+        invalidate_sidebar()
+        self.stdout.write(self.style.SUCCESS('Counters recomputed'))
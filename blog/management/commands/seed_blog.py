@@ -0,0 +1,112 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.batching import iterate_batches
+from blog.models import Comment, Post, Tag
+
+
+def make_zipf_weights(amount: int, exponent: float) -> list:
+    """
+    Make skewed weights, so few objects get most of the links.
+    :params amount: amount of objects.
+    :params exponent: skew, 0 gives uniform distribution.
+    :return: list of weights, first is the heaviest.
+    """
+    return [1 / (rank ** exponent) for rank in range(1, amount + 1)]
+
+
+class Command(BaseCommand):
+    help = 'Fill database with synthetic users, tags, posts, likes and comments for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--likes', type=int, default=200000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent for tags and posts popularity')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        now = timezone.now()
+        run_id = now.strftime('%Y%m%d%H%M%S')
+
+        users = (
+            User(username=f'synthetic-{run_id}-{number}', password='!', is_staff=number % 10 == 0)
+            for number in range(options['users'])
+        )
+        for batch in iterate_batches(users, batch_size):
+            User.objects.bulk_create(batch)
+        user_ids = list(User.objects.filter(username__startswith=f'synthetic-{run_id}-').values_list('id', flat=True))
+        author_ids = list(User.objects.filter(username__startswith=f'synthetic-{run_id}-', is_staff=True).
+                          values_list('id', flat=True)) or user_ids
+        self.stdout.write(f'Users: {len(user_ids)}')
+
+        tags = (Tag(title=f's{run_id[-6:]}-{number}') for number in range(options['tags']))
+        for batch in iterate_batches(tags, batch_size):
+            Tag.objects.bulk_create(batch)
+        tag_ids = list(Tag.objects.filter(title__startswith=f's{run_id[-6:]}-').order_by('id').
+                       values_list('id', flat=True))
+        self.stdout.write(f'Tags: {len(tag_ids)}')
+
+        posts = (
+            Post(
+                title=f'Synthetic post {number}',
+                text=' '.join(rng.choice(('lorem', 'ipsum', 'dolor', 'sit', 'amet')) for _ in range(300)),
+                slug=f'synthetic-{run_id}-{number}',
+                image='',
+                published_at=now - timedelta(minutes=rng.randrange(60 * 24 * 365 * 5)),
+                author_id=rng.choice(author_ids),
+            )
+            for number in range(options['posts'])
+        )
+        for batch in iterate_batches(posts, batch_size):
+            Post.objects.bulk_create(batch)
+        post_ids = list(Post.objects.filter(slug__startswith=f'synthetic-{run_id}-').values_list('id', flat=True))
+        self.stdout.write(f'Posts: {len(post_ids)}')
+
+        tag_weights = make_zipf_weights(len(tag_ids), options['skew'])
+        post_tags = (
+            Post.tags.through(post_id=post_id, tag_id=tag_id)
+            for post_id in post_ids
+            for tag_id in set(rng.choices(tag_ids, tag_weights, k=rng.randint(1, 4)))
+        )
+        for batch in iterate_batches(post_tags, batch_size):
+            Post.tags.through.objects.bulk_create(batch, ignore_conflicts=True)
+
+        post_weights = make_zipf_weights(len(post_ids), options['skew'])
+        shuffled_post_ids = rng.sample(post_ids, len(post_ids))
+        likes = (
+            Post.likes.through(post_id=post_id, user_id=rng.choice(user_ids))
+            for post_id in rng.choices(shuffled_post_ids, post_weights, k=options['likes'])
+        )
+        for batch in iterate_batches(likes, batch_size):
+            Post.likes.through.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f"Likes: up to {options['likes']}")
+
+        comments = (
+            Comment(
+                post_id=post_id,
+                author_id=rng.choice(user_ids),
+                text='Synthetic comment',
+                published_at=now - timedelta(minutes=rng.randrange(60 * 24 * 365)),
+            )
+            for post_id in rng.choices(shuffled_post_ids, post_weights, k=options['comments'])
+        )
+        for batch in iterate_batches(comments, batch_size):
+            Comment.objects.bulk_create(batch)
+        self.stdout.write(f"Comments: {options['comments']}")
+
+        call_command('recount_counters', batch_size=batch_size, stdout=self.stdout)
+        for cache_alias in ('default', 'pages'):
+            caches[cache_alias].clear()
+        self.stdout.write(self.style.SUCCESS('Synthetic data created'))
@@ -0,0 +1,55 @@
+import os
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog.static_files import ENCODINGS, get_immutable_names
+
+
+class Command(BaseCommand):
+    help = 'Show how many bytes precompressed static files save on a page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=reverse('index'), help='Page to check')
+
+    def handle(self, *args, **options):
+        with override_settings(ALLOWED_HOSTS=['*']):
+            response = Client().get(options['url'])
+        if response.status_code != 200:
+            raise CommandError(f"{options['url']} responded with {response.status_code}")
+
+        pattern = rf'(?:href|src)="{re.escape(settings.STATIC_URL)}([^"?#]+)'
+        static_names = sorted(set(re.findall(pattern, response.content.decode())))
+        if not static_names:
+            raise CommandError('Page has no static files, run collectstatic first')
+
+        totals = {'raw': 0, 'best': 0}
+        immutable_amount = 0
+        for name in static_names:
+            file_path = os.path.join(settings.STATIC_ROOT, name)
+            if not os.path.isfile(file_path):
+                self.stderr.write(f'{name}: not collected')
+                continue
+            sizes = {'raw': os.path.getsize(file_path)}
+            for encoding, suffix in ENCODINGS:
+                if os.path.isfile(f'{file_path}{suffix}'):
+                    sizes[encoding] = os.path.getsize(f'{file_path}{suffix}')
+            best_size = min(sizes.values())
+            totals['raw'] += sizes['raw']
+            totals['best'] += best_size
+            is_immutable = name in get_immutable_names()
+            immutable_amount += is_immutable
+
+            encoded_sizes = ', '.join(f'{encoding} {size}' for encoding, size in sizes.items())
+            self.stdout.write(f"{name}: {encoded_sizes}{', immutable' if is_immutable else ''}")
+
+        saved = totals['raw'] - totals['best']
+        saved_percent = saved / totals['raw'] * 100 if totals['raw'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(static_names)} static files, {immutable_amount} fingerprinted: "
+            f"{totals['raw']} bytes raw, {totals['best']} bytes sent, {saved} bytes saved ({saved_percent:.1f}%)"
+        ))
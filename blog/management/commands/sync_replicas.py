@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blog.sqlite import copy_sqlite_database
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database to the replica files, for local testing of the replica router'
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if not primary['ENGINE'].endswith('sqlite3'):
+            raise CommandError('Replicas can be copied only for SQLite, use replication of your database server')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replicas configured, set DATABASE_REPLICA_FILEPATHS')
+
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            copy_sqlite_database(primary['NAME'], settings.DATABASES[alias]['NAME'])
+            self.stdout.write(f"{alias}: copied to {settings.DATABASES[alias]['NAME']}")
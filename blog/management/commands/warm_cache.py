@@ -0,0 +1,72 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog.models import Post, Tag
+from blog.sidebar import get_archive_months, get_most_popular_posts, get_popular_tags
+from blog.views import get_index_posts
+
+
+def get_index_urls(pages_amount: int) -> list:
+    """
+    Collect urls of first index pages the way readers reach them, by links with cursors.
+    :params pages_amount: amount of pages.
+    :return: list of urls.
+    """
+    urls = [reverse('index')]
+    after = None
+    for page in range(1, pages_amount):
+        next_page_url = get_index_posts(page, after)['next_page_url']
+        if not next_page_url:
+            break
+        urls.append(next_page_url)
+        after = next_page_url.partition('?after=')[2]
+    return urls
+
+
+class Command(BaseCommand):
+    help = 'Fill sidebar and page caches with the index, top tags and top posts, e.g. after deploy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3, help='Index pages to warm')
+        parser.add_argument('--tags', type=int, default=10, help='Pages of the most popular tags to warm')
+        parser.add_argument('--posts', type=int, default=20, help='Pages of the most liked posts to warm')
+
+    def handle(self, *args, **options):
+        local_caches = [
+            alias for alias, cache_settings in settings.CACHES.items()
+            if cache_settings['BACKEND'].endswith('LocMemCache')
+        ]
+        if local_caches:
+            self.stderr.write(
+                f"Caches {', '.join(local_caches)} live in process memory, warming them here doesn't help web workers"
+            )
+
+        get_most_popular_posts(refresh=True)
+        get_popular_tags(refresh=True)
+        get_archive_months(refresh=True)
+
+        urls = get_index_urls(options['pages'])
+        tag_titles = Tag.objects.get_popular_posts().values_list('title', flat=True)[:options['tags']]
+        urls += [reverse('tag_filter', kwargs={'tag_title': tag_title}) for tag_title in tag_titles]
+        slugs = Post.objects.order_by('-likes_count').values_list('slug', flat=True)[:options['posts']]
+        urls += [reverse('post_detail', kwargs={'slug': slug}) for slug in slugs]
+
+        client = Client()
+        warmed_amount = 0
+        started_at = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for url in urls:
+                response = client.get(url)
+                if response.status_code != 200:
+                    self.stderr.write(f'{url}: {response.status_code}')
+                    continue
+                warmed_amount += response.get('X-Page-Cache') == 'MISS'
+        duration = time.perf_counter() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {warmed_amount} of {len(urls)} pages in {duration:.1f} s, others were already cached'
+        ))
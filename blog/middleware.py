@@ -0,0 +1,111 @@
+import abc
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.urls import reverse
+
+from blog.query_stats import QueryCollector, record_sample
+from blog.routers import is_primary_pinned, use_primary
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCapableMiddleware(abc.ABC):
+    """Base for middleware that wraps get_response and runs without a thread switch under ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.handle(request)
+
+    @abc.abstractmethod
+    def handle(self, request):
+        """Process request when get_response is sync."""
+
+    @abc.abstractmethod
+    async def __acall__(self, request):
+        """Process request when get_response is async."""
+
+
+class QueryBudgetMiddleware(AsyncCapableMiddleware):
+    """Count SQL queries of every request, report them in Server-Timing and log budget overruns."""
+
+    def handle(self, request):
+        collector = QueryCollector()
+        started_at = time.perf_counter()
+        with collector.watch():
+            response = self.get_response(request)
+        return self.report(request, response, collector, time.perf_counter() - started_at)
+
+    async def __acall__(self, request):
+        collector = QueryCollector()
+        started_at = time.perf_counter()
+        with collector.watch():
+            response = await self.get_response(request)
+        return self.report(request, response, collector, time.perf_counter() - started_at)
+
+    def report(self, request, response, collector: QueryCollector, total_duration: float):
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={collector.duration * 1000:.2f};desc="{collector.queries_amount} queries"',
+            f'total;dur={total_duration * 1000:.2f}',
+        ])
+
+        resolver_match = request.resolver_match
+        if not resolver_match or not resolver_match.url_name:
+            return response
+
+        url_name = resolver_match.url_name
+        record_sample(url_name, collector.queries_amount, collector.duration)
+
+        query_budget = settings.QUERY_BUDGETS.get(url_name, settings.QUERY_BUDGET_DEFAULT)
+        if collector.queries_amount > query_budget:
+            logger.warning(
+                'Query budget exceeded on %s (%s): %s queries, budget %s, %.2f ms in DB',
+                url_name, request.path, collector.queries_amount, query_budget, collector.duration * 1000,
+            )
+        return response
+
+
+class ReplicaStickinessMiddleware(AsyncCapableMiddleware):
+    """
+    Read from the primary database for unsafe requests, admin pages and for a while after a write,
+    so users see their own changes while replicas catch up.
+    """
+
+    def handle(self, request):
+        pinned = self.is_pinned(request)
+        with use_primary(pinned):
+            response = self.get_response(request)
+            has_written = is_primary_pinned() and not pinned
+        return self.remember_write(request, response, has_written)
+
+    async def __acall__(self, request):
+        pinned = self.is_pinned(request)
+        with use_primary(pinned):
+            response = await self.get_response(request)
+            has_written = is_primary_pinned() and not pinned
+        return self.remember_write(request, response, has_written)
+
+    def is_pinned(self, request) -> bool:
+        return (
+            is_primary_pinned()
+            or request.method not in ('GET', 'HEAD', 'OPTIONS')
+            or request.path.startswith(reverse('admin:index'))
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        )
+
+    def remember_write(self, request, response, has_written: bool):
+        if has_written or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:25
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_rows(queryset, field_name):
+    rows_amount = queryset.filter(**{field_name: OuterRef('pk')}).order_by().values(field_name). \
+        annotate(amount=Count('*')).values('amount')
+    return Coalesce(Subquery(rows_amount, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Tag = apps.get_model('blog', 'Tag')
+    Comment = apps.get_model('blog', 'Comment')
+
+    Post.objects.update(
+        likes_count=count_rows(Post.likes.through.objects.all(), 'post_id'),
+        comments_count=count_rows(Comment.objects.all(), 'post_id'),
+    )
+    Tag.objects.update(posts_count=count_rows(Post.tags.through.objects.all(), 'tag_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_auto_20220723_1750'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Количество лайков'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='posts_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_related_posts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'published_at', 'id'], name='comment_post_feed_idx'),
+        ),
+    ]
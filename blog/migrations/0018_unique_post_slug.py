@@ -0,0 +1,36 @@
+# Generated by Django 3.1.14 on 2026-10-18 03:35
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def make_slugs_unique(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    duplicated_slugs = Post.objects.values('slug').annotate(amount=Count('id')).filter(amount__gt=1). \
+        values_list('slug', flat=True)
+    for slug in duplicated_slugs:
+        duplicates = Post.objects.filter(slug=slug).order_by('id')[1:]
+        for post in duplicates:
+            post.slug = f'{slug[:190]}-{post.id}'
+            post.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_comment_post_feed_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_slugs_unique, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='comment',
+            name='published_at',
+            field=models.DateTimeField(db_index=True, verbose_name='Дата и время публикации'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='slug',
+            field=models.SlugField(max_length=200, unique=True, verbose_name='Название в виде url'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_unique_post_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Заполняется, когда готовы уменьшенные копии картинки', null=True, verbose_name='Ширина картинки'),
+        ),
+    ]
@@ -1,7 +1,11 @@
+from datetime import datetime
+
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models import Count
 from django.urls import reverse
+from django.utils import timezone
+
+TAG_SORT_LIMIT = 1000
 
 
 class PostQuerySet(models.QuerySet):
@@ -9,52 +13,62 @@ class PostQuerySet(models.QuerySet):
 
     def filter_by_year(self, year):
         """
-        Manager that filter posts by year.
+        Manager that filter posts by year. Dates are compared with bounds of the year,
+        so the publication date index is used.
         :params year: value for filtering by.
         :return: filtered posts.
         """
-        posts_at_year = self.filter(published_at__year=year).order_by('published_at')
-        return posts_at_year
+        posts_at_year = self.filter_by_period(datetime(year, 1, 1), datetime(year + 1, 1, 1))
+        return posts_at_year.order_by('published_at')
 
-    def count_comments(self):
+    def filter_by_month(self, year, month):
         """
-        Manager that counts comments.
-        :return: posts with comments amount.
+        Manager that filter posts by month of year.
+        :params year: year of the month.
+        :params month: number of the month from 1 to 12.
+        :return: filtered posts.
         """
-        return self.annotate(comments_count=Count('comments'))
+        next_month = datetime(year + month // 12, month % 12 + 1, 1)
+        return self.filter_by_period(datetime(year, month, 1), next_month)
 
-    def count_likes(self):
+    def filter_by_period(self, start, end):
         """
-        Manager that counts likes.
-        :return: posts with likes amount.
+        Manager that filter posts published in period, dates are taken in the current time zone.
+        :params start: naive datetime of the period start, included.
+        :params end: naive datetime of the period end, excluded.
+        :return: filtered posts.
         """
-        return self.annotate(likes_count=Count('likes'))
+        return self.filter(
+            published_at__gte=timezone.make_aware(start),
+            published_at__lt=timezone.make_aware(end),
+        )
 
-    def fetch_with_comments_count(self):
+    def prefetch_tags(self):
         """
-        Manager that counts comments and assign their to post objects. Use to avoid problem with using two annotates.
-        :return: posts with comments amount.
+        Manager that prefetch post's tags without sorting them in SQL.
+        :return: posts with tags prefetch.
         """
-        most_popular_posts_ids = [post.id for post in self]
-        posts_with_comments = Post.objects.filter(id__in=most_popular_posts_ids).annotate(
-            comments_count=Count('comments'))
-        ids_and_comments = posts_with_comments.values_list('id', 'comments_count')
-        count_for_id = dict(ids_and_comments)
+        return self.prefetch_related(models.Prefetch('tags', queryset=Tag.objects.order_by()))
 
-        for post in self:
-            post.comments_count = count_for_id[post.id]
-        return self
+    def filter_by_tag(self, tag):
+        """
+        Manager that filter posts by tag. Posts of popular tags are checked one by one in order of
+        publication, so fetching the newest ones doesn't sort all of them.
+        :params tag: tag for filtering by.
+        :return: filtered posts.
+        """
+        if tag.posts_count < TAG_SORT_LIMIT:
+            return self.filter(tags=tag)
+        post_tags = Post.tags.through.objects.filter(post_id=models.OuterRef('pk'), tag_id=tag.id)
+        return self.filter(models.Exists(post_tags))
 
-    def get_most_popular_posts(self, posts_prefetch, top_obj_amount):
+    def get_most_popular_posts(self, top_obj_amount):
         """
-        Manager that annotate and prefetch posts with likes and authors.
-        :params posts_prefetch: amount of slicing posts.
+        Manager that order posts by likes and prefetch authors and tags.
         :params top_obj_amount: amount of slicing posts.
-        :return: queryset ordered by likes, with authors and posts with comments amount; post's prefetch.
+        :return: queryset ordered by likes, with authors and post's prefetch.
         """
-        popular_posts = self.count_likes().order_by('-likes_count').prefetch_related('author').prefetch_related(
-            posts_prefetch)[:top_obj_amount].fetch_with_comments_count()
-        most_popular_posts = popular_posts[:top_obj_amount]
+        most_popular_posts = self.order_by('-likes_count').prefetch_related('author').prefetch_tags()[:top_obj_amount]
         return most_popular_posts
 
 
@@ -63,17 +77,10 @@ class TagQuerySet(models.QuerySet):
 
     def get_popular_posts(self):
         """
-        Manager that count posts on tag.
+        Manager that order tags by posts amount.
         :return: popular tags order from max to min.
         """
-        return self.count_posts().order_by('-posts_amount')
-
-    def count_posts(self):
-        """
-        Manager that count posts on tag.
-        :return: tags with posts amount.
-        """
-        return self.annotate(posts_amount=Count('posts'))
+        return self.order_by('-posts_count')
 
 
 class Post(models.Model):
@@ -81,8 +88,15 @@ class Post(models.Model):
 
     title = models.CharField('Заголовок', max_length=200)
     text = models.TextField('Текст')
-    slug = models.SlugField('Название в виде url', max_length=200)
+    slug = models.SlugField('Название в виде url', max_length=200, unique=True)
     image = models.ImageField('Картинка')
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='Заполняется, когда готовы уменьшенные копии картинки',
+    )
     published_at = models.DateTimeField('Дата и время публикации')
     author = models.ForeignKey(
         User,
@@ -101,10 +115,15 @@ class Post(models.Model):
         related_name='posts',
         verbose_name='Теги',
     )
+    likes_count = models.PositiveIntegerField('Количество лайков', default=0, db_index=True, editable=False)
+    comments_count = models.PositiveIntegerField('Количество комментариев', default=0, db_index=True, editable=False)
     objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-published_at']
+        indexes = [
+            models.Index(fields=['-published_at', '-id'], name='post_feed_idx'),
+        ]
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
 
@@ -119,6 +138,7 @@ class Tag(models.Model):
     """Model that describes tag object."""
 
     title = models.CharField('Тег', max_length=20, unique=True)
+    posts_count = models.PositiveIntegerField('Количество постов', default=0, db_index=True, editable=False)
     objects = TagQuerySet.as_manager()
 
     class Meta:
@@ -140,7 +160,7 @@ class Comment(models.Model):
     """Model that describes comment object."""
 
     text = models.TextField('Текст комментария')
-    published_at = models.DateTimeField('Дата и время публикации')
+    published_at = models.DateTimeField('Дата и время публикации', db_index=True)
 
     post = models.ForeignKey(
         'Post',
@@ -156,8 +176,78 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['published_at']
+        indexes = [
+            models.Index(fields=['post', 'published_at', 'id'], name='comment_post_feed_idx'),
+        ]
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
 
     def __str__(self):
         return f'{self.author.username} under {self.post.title}'
+
+
+class ArchiveMonth(models.Model):
+    """Model that describes amount of posts published in month, kept in sync with posts."""
+
+    year = models.PositiveSmallIntegerField('Год')
+    month = models.PositiveSmallIntegerField('Месяц')
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month'], name='unique_archive_month'),
+        ]
+        verbose_name = 'месяц архива'
+        verbose_name_plural = 'месяцы архива'
+
+    def __str__(self):
+        return f'{self.month:02}.{self.year}'
+
+    def get_absolute_url(self):
+        return reverse('archive', kwargs={'year': self.year, 'month': self.month})
+
+
+class RelatedPost(models.Model):
+    """Model that describes precomputed similarity between two posts."""
+
+    post = models.ForeignKey(
+        'Post',
+        on_delete=models.CASCADE,
+        related_name='related_posts',
+        verbose_name='Пост')
+    related = models.ForeignKey(
+        'Post',
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий пост')
+    score = models.FloatField('Похожесть')
+
+    class Meta:
+        ordering = ['post', '-score']
+        indexes = [
+            models.Index(fields=['post', '-score'], name='related_post_score_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related'], name='unique_related_post'),
+        ]
+        verbose_name = 'похожий пост'
+        verbose_name_plural = 'похожие посты'
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id}'
+
+
+class RelatedPostsRefresh(models.Model):
+    """Model that describes post which related posts must be recomputed."""
+
+    post = models.OneToOneField(
+        'Post',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пост')
+
+    class Meta:
+        verbose_name = 'пост для пересчёта похожих'
+        verbose_name_plural = 'посты для пересчёта похожих'
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from blog.concurrency import run_query
+from blog.models import Post, Tag
+
+HITS_KEY = 'page:stats:hits'
+MISSES_KEY = 'page:stats:misses'
+
+
+def get_page_cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+def make_hash(value: str) -> str:
+    return md5(value.encode('utf-8')).hexdigest()
+
+
+def make_new_version() -> int:
+    """
+    Make version for a group whose version is not in cache, e.g. after eviction.
+    Versions are taken from the clock, so keys of evicted versions never come back.
+    """
+    return time.time_ns()
+
+
+def get_group_version(group: str) -> int:
+    """
+    Get current version of cached pages group. Purging the group bumps the version.
+    :params group: name of pages group, e.g. 'index' or 'post:<slug>'.
+    :return: version number.
+    """
+    page_cache = get_page_cache()
+    version_key = f'page:version:{make_hash(group)}'
+    new_version = make_new_version()
+    page_cache.add(version_key, new_version, None)
+    return page_cache.get(version_key, new_version)
+
+
+def get_groups_versions(groups) -> dict:
+    """
+    Get current versions of many pages groups, with one cache request when all of them are cached.
+    :params groups: names of pages groups.
+    :return: dict with groups as keys and version numbers as values.
+    """
+    page_cache = get_page_cache()
+    version_key_for_group = {group: f'page:version:{make_hash(group)}' for group in groups}
+    versions = page_cache.get_many(version_key_for_group.values())
+    missing_keys = [version_key for version_key in version_key_for_group.values() if version_key not in versions]
+    if missing_keys:
+        new_version = make_new_version()
+        for version_key in missing_keys:
+            page_cache.add(version_key, new_version, None)
+        versions.update(page_cache.get_many(missing_keys))
+    return {
+        group: versions.get(version_key, make_new_version())
+        for group, version_key in version_key_for_group.items()
+    }
+
+
+def purge_pages(*groups: str):
+    """
+    Evict all cached pages of groups, including every query string variant.
+    :params groups: names of pages groups.
+    """
+    page_cache = get_page_cache()
+    for group in groups:
+        version_key = f'page:version:{make_hash(group)}'
+        try:
+            page_cache.incr(version_key)
+        except ValueError:
+            page_cache.set(version_key, make_new_version(), None)
+
+
+def count_stat(stat_key: str):
+    page_cache = get_page_cache()
+    page_cache.add(stat_key, 0, None)
+    try:
+        page_cache.incr(stat_key)
+    except ValueError:
+        page_cache.set(stat_key, 1, None)
+
+
+def get_stats() -> dict:
+    page_cache = get_page_cache()
+    return {
+        'hits': page_cache.get(HITS_KEY, 0),
+        'misses': page_cache.get(MISSES_KEY, 0),
+    }
+
+
+def reset_stats():
+    get_page_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def get_page_key(request, group: str):
+    """
+    Make cache key of the page, if the page can be served from cache.
+    :params request: current request.
+    :params group: name of pages group.
+    :return: cache key or None for unsafe methods and logged in users.
+    """
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return None
+    return f'page:{get_group_version(group)}:{make_hash(request.get_full_path())}'
+
+
+def get_cached_response(page_key: str):
+    cached_page = get_page_cache().get(page_key)
+    if cached_page is None:
+        count_stat(MISSES_KEY)
+        return None
+    count_stat(HITS_KEY)
+    content, content_type = cached_page
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'HIT'
+    return response
+
+
+def cache_response(page_key: str, response: HttpResponse):
+    if response.status_code == 200 and not response.streaming:
+        get_page_cache().set(page_key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+    response['X-Page-Cache'] = 'MISS'
+
+
+def cache_page_for_anonymous(get_group):
+    """
+    Decorator that caches whole responses of view for anonymous readers, works with sync and async views.
+    Cached pages are grouped, so writes purge only the pages they affect.
+    :params get_group: function that takes view kwargs and returns pages group name.
+    :return: view decorator.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                page_key = await run_query(get_page_key, request, get_group(**kwargs))
+                if page_key is None:
+                    return await view(request, *args, **kwargs)
+                response = await run_query(get_cached_response, page_key)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    await run_query(cache_response, page_key, response)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            page_key = get_page_key(request, get_group(**kwargs))
+            if page_key is None:
+                return view(request, *args, **kwargs)
+            response = get_cached_response(page_key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                cache_response(page_key, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def get_index_group(**kwargs) -> str:
+    return 'index'
+
+
+def get_feeds_group(**kwargs) -> str:
+    return 'feeds'
+
+
+def get_post_group(slug: str, **kwargs) -> str:
+    return f'post:{slug}'
+
+
+def get_tag_group(tag_title: str, **kwargs) -> str:
+    return f'tag:{tag_title}'
+
+
+def purge_posts_pages(post_ids, with_tags: bool = True):
+    """
+    Purge cached pages of posts, optionally with pages of their tags and the index.
+    :params post_ids: ids of changed posts.
+    :params with_tags: whether posts cards on tag pages and index have changed too.
+    """
+    slugs = Post.objects.filter(id__in=post_ids).order_by().values_list('slug', flat=True)
+    groups = [get_post_group(slug) for slug in slugs]
+    if with_tags:
+        tag_titles = Tag.objects.filter(posts__id__in=post_ids).order_by().values_list('title', flat=True).distinct()
+        groups += [get_tag_group(tag_title) for tag_title in tag_titles]
+        groups.append(get_index_group())
+    purge_pages(*groups)
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+POSTS_PER_PAGE = 5
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(published_at: datetime, obj_id: int) -> str:
+    """
+    Encode position of object in feed ordered by (published_at, id).
+    :params published_at: publication date of the object.
+    :params obj_id: id of the object.
+    :return: cursor string safe to put into url.
+    """
+    microseconds = (published_at - EPOCH) // timedelta(microseconds=1)
+    return f'{microseconds}-{obj_id}'
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode cursor made by encode_cursor.
+    :params cursor: cursor string from url.
+    :return: tuple of publication date and id or None if cursor is broken.
+    """
+    microseconds, _, obj_id = cursor.rpartition('-')
+    if not microseconds.lstrip('-').isdigit() or not obj_id.isdigit():
+        return None
+    try:
+        return EPOCH + timedelta(microseconds=int(microseconds)), int(obj_id)
+    except (OverflowError, ValueError):
+        return None
+
+
+def paginate_by_keyset(queryset, page: int, after: str = None, before: str = None,
+                       per_page: int = POSTS_PER_PAGE) -> dict:
+    """
+    Fetch one page of newest-first feed with LIMIT in SQL.
+    Cursors make every page cost the same, without cursor page is fetched by OFFSET.
+    :params queryset: objects with published_at field.
+    :params page: page number, used when no valid cursor is given.
+    :params after: cursor of the last object on the previous page.
+    :params before: cursor of the first object on the next page.
+    :params per_page: amount of objects on page.
+    :return: objects of the page with flags of previous and next pages existence.
+    """
+    after_position = decode_cursor(after) if after else None
+    before_position = decode_cursor(before) if before else None
+
+    if after_position:
+        published_at, obj_id = after_position
+        page_objects = list(queryset.filter(
+            Q(published_at__lt=published_at) | Q(published_at=published_at, id__lt=obj_id),
+        ).order_by('-published_at', '-id')[:per_page + 1])
+        has_previous = True
+        has_next = len(page_objects) > per_page
+    elif before_position:
+        published_at, obj_id = before_position
+        page_objects = list(queryset.filter(
+            Q(published_at__gt=published_at) | Q(published_at=published_at, id__gt=obj_id),
+        ).order_by('published_at', 'id')[:per_page + 1])
+        has_previous = len(page_objects) > per_page
+        has_next = True
+        page_objects = page_objects[:per_page][::-1]
+    else:
+        offset = (page - 1) * per_page
+        page_objects = list(queryset.order_by('-published_at', '-id')[offset:offset + per_page + 1])
+        has_previous = page > 1
+        has_next = len(page_objects) > per_page
+
+    return {
+        'objects': page_objects[:per_page],
+        'has_previous': has_previous,
+        'has_next': has_next,
+    }
+
+
+def paginate_values_by_keyset(queryset, after: str = None, per_page: int = POSTS_PER_PAGE) -> dict:
+    """
+    Fetch one page of oldest-first feed of values() rows with LIMIT in SQL.
+    :params queryset: values() queryset with published_at and id keys.
+    :params after: cursor of the last row on the previous page.
+    :params per_page: amount of rows on page.
+    :return: rows of the page, next page cursor or None if it is the last page.
+    """
+    after_position = decode_cursor(after) if after else None
+    if after_position:
+        published_at, obj_id = after_position
+        queryset = queryset.filter(Q(published_at__gt=published_at) | Q(published_at=published_at, id__gt=obj_id))
+    page_rows = list(queryset.order_by('published_at', 'id')[:per_page + 1])
+
+    next_cursor = None
+    if len(page_rows) > per_page:
+        last_row = page_rows[per_page - 1]
+        next_cursor = encode_cursor(last_row['published_at'], last_row['id'])
+    return {
+        'objects': page_rows[:per_page],
+        'next_cursor': next_cursor,
+    }
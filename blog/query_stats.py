@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+URL_NAMES_KEY = 'query_stats:url_names'
+
+local_samples = defaultdict(list)
+requests_since_flush = 0
+samples_lock = threading.Lock()
+flush_lock = threading.Lock()
+
+active_collectors = ContextVar('active_collectors', default=())
+
+
+class QueryCollector:
+    """Counts queries and sums their duration, also for queries made in other threads on behalf of the request."""
+
+    def __init__(self):
+        self.queries_amount = 0
+        self.duration = 0.0
+        self.lock = threading.Lock()
+
+    def add_query(self, duration: float):
+        with self.lock:
+            self.duration += duration
+            self.queries_amount += 1
+
+    @contextmanager
+    def watch(self):
+        """
+        Collect queries made inside the block, including threads that copy its context, like sync_to_async.
+        """
+        token = active_collectors.set(active_collectors.get() + (self,))
+        try:
+            yield self
+        finally:
+            active_collectors.reset(token)
+
+
+def collect_query(execute, sql, params, many, context):
+    collectors = active_collectors.get()
+    if not collectors:
+        return execute(sql, params, many, context)
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started_at
+        for collector in collectors:
+            collector.add_query(duration)
+
+
+def install_query_collector(sender, connection, **kwargs):
+    if collect_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(collect_query)
+
+
+def get_stats_cache():
+    return caches[settings.QUERY_STATS_CACHE_ALIAS]
+
+
+def get_samples_key(url_name: str) -> str:
+    return f'query_stats:samples:{url_name}'
+
+
+def record_sample(url_name: str, queries_amount: int, duration: float):
+    """
+    Remember request stats in process memory and periodically merge them into the shared cache.
+    :params url_name: name of the resolved url.
+    :params queries_amount: amount of SQL queries made by the request.
+    :params duration: total time of SQL queries in seconds.
+    """
+    global requests_since_flush
+    with samples_lock:
+        local_samples[url_name].append((queries_amount, duration))
+        requests_since_flush += 1
+        is_flush_due = requests_since_flush >= settings.QUERY_STATS_FLUSH_EVERY
+    if is_flush_due:
+        flush_samples()
+
+
+def flush_samples():
+    """
+    Move samples collected by the process to the shared cache, requests keep recording into a new dict.
+    Flushes of one process run one at a time, so they don't overwrite each other's merged samples.
+    """
+    global local_samples, requests_since_flush
+    with flush_lock:
+        with samples_lock:
+            samples_for_url_name = local_samples
+            local_samples = defaultdict(list)
+            requests_since_flush = 0
+        if not samples_for_url_name:
+            return
+
+        stats_cache = get_stats_cache()
+        max_samples = settings.QUERY_STATS_MAX_SAMPLES
+        url_names = set(stats_cache.get(URL_NAMES_KEY, []))
+        for url_name, samples in samples_for_url_name.items():
+            stored_samples = stats_cache.get(get_samples_key(url_name), []) + samples
+            stats_cache.set(get_samples_key(url_name), stored_samples[-max_samples:], None)
+            url_names.add(url_name)
+        stats_cache.set(URL_NAMES_KEY, sorted(url_names), None)
+
+
+def get_percentile(values: list, percent: int):
+    """
+    Find nearest-rank percentile.
+    :params values: sorted values.
+    :params percent: percentile from 0 to 100.
+    :return: value of the percentile.
+    """
+    rank = max(0, -(-percent * len(values) // 100) - 1)
+    return values[rank]
+
+
+def get_report() -> dict:
+    """
+    Aggregate stored samples into per url name percentiles.
+    :return: dict with url names as keys and stats as values.
+    """
+    stats_cache = get_stats_cache()
+    report = {}
+    for url_name in stats_cache.get(URL_NAMES_KEY, []):
+        samples = stats_cache.get(get_samples_key(url_name), [])
+        if not samples:
+            continue
+        queries = sorted(queries_amount for queries_amount, _ in samples)
+        durations = sorted(duration * 1000 for _, duration in samples)
+        report[url_name] = {
+            'requests': len(samples),
+            'queries': {f'p{percent}': get_percentile(queries, percent) for percent in (50, 90, 99)},
+            'db_ms': {f'p{percent}': round(get_percentile(durations, percent), 2) for percent in (50, 90, 99)},
+        }
+    return report
+
+
+def reset_report():
+    stats_cache = get_stats_cache()
+    url_names = stats_cache.get(URL_NAMES_KEY, [])
+    stats_cache.delete_many([get_samples_key(url_name) for url_name in url_names] + [URL_NAMES_KEY])
@@ -0,0 +1,212 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from blog.batching import iterate_batches
+from blog.models import Post, RelatedPost, RelatedPostsRefresh
+from blog.page_cache import purge_posts_pages
+
+RELATED_POSTS_AMOUNT = 5
+TAG_WEIGHT = 1.0
+CO_LIKE_WEIGHT = 2.0
+MAX_TAG_FANOUT = 5000
+MAX_USER_FANOUT = 1000
+IDS_CHUNK_SIZE = 500
+
+
+def load_incidence(through_model, row_field: str, column_field: str) -> tuple:
+    """
+    Load sparse incidence matrix of M2M relation as rows and columns adjacency sets.
+    :params through_model: through table of the relation.
+    :params row_field: column with post ids.
+    :params column_field: column with tag or user ids.
+    :return: dict of post id to set of column ids, dict of column id to set of post ids
+    and dict of post id to inverse norm of its row.
+    """
+    columns_for_row = defaultdict(set)
+    rows_for_column = defaultdict(set)
+    pairs = through_model.objects.order_by().values_list(row_field, column_field).iterator(chunk_size=10000)
+    for row_id, column_id in pairs:
+        columns_for_row[row_id].add(column_id)
+        rows_for_column[column_id].add(row_id)
+    inverse_norms = {row_id: 1 / math.sqrt(len(column_ids)) for row_id, column_ids in columns_for_row.items()}
+    return columns_for_row, rows_for_column, inverse_norms
+
+
+def load_posts_incidence(through_model, row_field: str, column_field: str, post_ids, max_fanout: int) -> tuple:
+    """
+    Load only the part of sparse incidence matrix needed to compute rows of some posts: their own rows,
+    other posts of their columns and norms of those posts. Columns linked to too many posts are not loaded,
+    count_overlaps skips them anyway.
+    :params through_model: through table of the relation.
+    :params row_field: column with post ids.
+    :params column_field: column with tag or user ids.
+    :params post_ids: posts which rows will be computed.
+    :params max_fanout: max amount of posts in column to take it into account.
+    :return: same as load_incidence.
+    """
+    pairs = through_model.objects.order_by()
+    columns_for_row = defaultdict(set)
+    for ids_chunk in iterate_batches(post_ids, IDS_CHUNK_SIZE):
+        for row_id, column_id in pairs.filter(**{f'{row_field}__in': ids_chunk}).values_list(row_field, column_field):
+            columns_for_row[row_id].add(column_id)
+
+    rows_for_column = defaultdict(set)
+    for ids_chunk in iterate_batches(set().union(*columns_for_row.values()), IDS_CHUNK_SIZE):
+        columns_sizes = pairs.filter(**{f'{column_field}__in': ids_chunk}).values(column_field).annotate(
+            rows_amount=Count(row_field),
+        ).values_list(column_field, 'rows_amount')
+        small_column_ids = [column_id for column_id, rows_amount in columns_sizes if rows_amount <= max_fanout]
+        column_pairs = pairs.filter(**{f'{column_field}__in': small_column_ids}).values_list(row_field, column_field)
+        for row_id, column_id in column_pairs.iterator(chunk_size=10000):
+            rows_for_column[column_id].add(row_id)
+
+    columns_amount_for_row = {row_id: len(column_ids) for row_id, column_ids in columns_for_row.items()}
+    other_row_ids = set().union(*rows_for_column.values()) - columns_for_row.keys()
+    for ids_chunk in iterate_batches(other_row_ids, IDS_CHUNK_SIZE):
+        columns_amount_for_row.update(pairs.filter(**{f'{row_field}__in': ids_chunk}).values(row_field).annotate(
+            columns_amount=Count(column_field),
+        ).values_list(row_field, 'columns_amount'))
+    inverse_norms = {row_id: 1 / math.sqrt(amount) for row_id, amount in columns_amount_for_row.items()}
+    return columns_for_row, rows_for_column, inverse_norms
+
+
+def get_affected_post_ids(post_ids, tags: tuple, likes: tuple) -> set:
+    """
+    Find posts which related posts may change after changes of the posts: the posts themselves,
+    posts that share a tag or a liker with them and posts that list them as related now.
+    :params post_ids: changed posts.
+    :params tags: incidence of changed posts and tags.
+    :params likes: incidence of changed posts and users who liked them.
+    :return: set of post ids.
+    """
+    affected_ids = set(post_ids)
+    for _, rows_for_column, _ in (tags, likes):
+        affected_ids.update(*rows_for_column.values())
+    for ids_chunk in iterate_batches(post_ids, IDS_CHUNK_SIZE):
+        affected_ids.update(RelatedPost.objects.filter(related_id__in=ids_chunk).values_list('post_id', flat=True))
+    return affected_ids
+
+
+def count_overlaps(post_id: int, columns_for_row: dict, rows_for_column: dict, max_fanout: int) -> Counter:
+    """
+    Compute one row of A·Aᵀ for sparse incidence matrix A: shared columns with every other post.
+    Columns linked to too many posts are skipped, they cost a lot and say little about similarity.
+    :params post_id: post which row is computed.
+    :params columns_for_row: post id to set of column ids.
+    :params rows_for_column: column id to set of post ids.
+    :params max_fanout: max amount of posts in column to take it into account.
+    :return: counter of other post ids and shared columns amount.
+    """
+    overlaps = Counter()
+    for column_id in columns_for_row.get(post_id, ()):
+        posts_in_column = rows_for_column[column_id]
+        if len(posts_in_column) > max_fanout:
+            continue
+        overlaps.update(posts_in_column)
+    overlaps.pop(post_id, None)
+    return overlaps
+
+
+def compute_related_posts(post_id: int, tags: tuple, likes: tuple, amount: int) -> list:
+    """
+    Rank posts by cosine similarity of their tags and of users who liked them.
+    :params post_id: post to find related posts for.
+    :params tags: incidence of posts and tags.
+    :params likes: incidence of posts and users who liked them.
+    :params amount: max amount of related posts.
+    :return: list of related post ids and scores, best first.
+    """
+    tags_for_post, posts_for_tag, tags_inverse_norms = tags
+    likers_for_post, posts_for_liker, likers_inverse_norms = likes
+    shared_tags = count_overlaps(post_id, tags_for_post, posts_for_tag, MAX_TAG_FANOUT)
+    shared_likers = count_overlaps(post_id, likers_for_post, posts_for_liker, MAX_USER_FANOUT)
+
+    tags_weight = TAG_WEIGHT * tags_inverse_norms.get(post_id, 0)
+    scores = {
+        other_id: tags_weight * shared_amount * tags_inverse_norms[other_id]
+        for other_id, shared_amount in shared_tags.items()
+    }
+    likes_weight = CO_LIKE_WEIGHT * likers_inverse_norms.get(post_id, 0)
+    for other_id, shared_amount in shared_likers.items():
+        scores[other_id] = scores.get(other_id, 0) + likes_weight * shared_amount * likers_inverse_norms[other_id]
+    # equal scores are ordered by id, so the result does not depend on which posts were loaded
+    return heapq.nlargest(amount, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def store_related_posts(post_ids, tags: tuple, likes: tuple, amount: int):
+    rows = [
+        RelatedPost(post_id=post_id, related_id=related_id, score=score)
+        for post_id in post_ids
+        for related_id, score in compute_related_posts(post_id, tags, likes, amount)
+    ]
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=post_ids).delete()
+        RelatedPost.objects.bulk_create(rows)
+    purge_posts_pages(post_ids, with_tags=False)
+
+
+def load_related_posts_inputs(queued_ids: list, full: bool) -> tuple:
+    """
+    Load posts to recompute and incidence matrices to compute them from.
+    :params queued_ids: posts queued after their likes or tags changed.
+    :params full: recompute every post instead of queued ones and their neighbours.
+    :return: list of post ids, incidence of posts and tags, incidence of posts and likers.
+    """
+    if full:
+        post_ids = list(Post.objects.order_by('id').values_list('id', flat=True))
+        tags = load_incidence(Post.tags.through, 'post_id', 'tag_id')
+        likes = load_incidence(Post.likes.through, 'post_id', 'user_id')
+        return post_ids, tags, likes
+
+    tags = load_posts_incidence(Post.tags.through, 'post_id', 'tag_id', queued_ids, MAX_TAG_FANOUT)
+    likes = load_posts_incidence(Post.likes.through, 'post_id', 'user_id', queued_ids, MAX_USER_FANOUT)
+    post_ids = sorted(get_affected_post_ids(queued_ids, tags, likes))
+    tags = load_posts_incidence(Post.tags.through, 'post_id', 'tag_id', post_ids, MAX_TAG_FANOUT)
+    likes = load_posts_incidence(Post.likes.through, 'post_id', 'user_id', post_ids, MAX_USER_FANOUT)
+    return post_ids, tags, likes
+
+
+def refresh_related_posts(full: bool = False, amount: int = RELATED_POSTS_AMOUNT, batch_size: int = 1000) -> int:
+    """
+    Recompute related posts of all posts or only of posts affected by the queued changes of likes or tags.
+    Queue rows are taken before reading the data, so posts queued during the run stay for the next one.
+    :params full: recompute every post instead of queued ones.
+    :params amount: max amount of related posts stored for each post.
+    :params batch_size: amount of posts written in one transaction.
+    :return: amount of refreshed posts.
+    """
+    queued_ids = list(RelatedPostsRefresh.objects.order_by('post_id').values_list('post_id', flat=True))
+    if not queued_ids and not full:
+        return 0
+    for ids_chunk in iterate_batches(queued_ids, IDS_CHUNK_SIZE):
+        RelatedPostsRefresh.objects.filter(post_id__in=ids_chunk).delete()
+
+    try:
+        post_ids, tags, likes = load_related_posts_inputs(queued_ids, full)
+        for batch in iterate_batches(post_ids, batch_size):
+            store_related_posts(batch, tags, likes, amount)
+    except BaseException:
+        queue_related_posts_refresh(queued_ids)
+        raise
+    return len(post_ids)
+
+
+def queue_related_posts_refresh(post_ids):
+    RelatedPostsRefresh.objects.bulk_create(
+        [RelatedPostsRefresh(post_id=post_id) for post_id in post_ids],
+        ignore_conflicts=True,
+    )
+
+
+def get_related_post_ids(post_id: int, amount: int = RELATED_POSTS_AMOUNT) -> list:
+    """
+    Read precomputed related posts.
+    :params post_id: post to find related posts for.
+    :params amount: max amount of related posts.
+    :return: ids of related posts, best first.
+    """
+    return list(RelatedPost.objects.filter(post_id=post_id).values_list('related_id', flat=True)[:amount])
@@ -0,0 +1,62 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY_DATABASE = 'default'
+PRIMARY_ONLY_APPS = {'sessions'}
+
+primary_pinned = ContextVar('primary_pinned', default=False)
+chosen_replica = ContextVar('chosen_replica', default=None)
+
+
+def is_primary_pinned() -> bool:
+    return primary_pinned.get()
+
+
+def pin_primary():
+    primary_pinned.set(True)
+
+
+@contextmanager
+def use_primary(pinned: bool = True):
+    """
+    Send reads inside the block to the primary database.
+    Reads of the block that are not pinned go to one replica chosen on the first read.
+    :params pinned: False lets reads go to replicas again, unless a write inside the block pins them.
+    """
+    pinned_token = primary_pinned.set(pinned)
+    replica_token = chosen_replica.set(None)
+    try:
+        yield
+    finally:
+        chosen_replica.reset(replica_token)
+        primary_pinned.reset(pinned_token)
+
+
+class PrimaryReplicaRouter:
+    """Send writes to the primary and reads to a random replica, unless the request has to read its own writes."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_primary_pinned() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY_DATABASE
+        replica = chosen_replica.get()
+        if replica is None:
+            replica = random.choice(replicas)
+            chosen_replica.set(replica)
+        return replica
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY_DATABASE, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DATABASE
@@ -0,0 +1,208 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import OperationalError, connection, connections, router
+from django.utils.html import escape
+
+from blog.models import Post
+
+FTS_TABLE = 'blog_post_fts'
+SNIPPET_WORDS = 24
+TITLE_WEIGHT = 10.0
+MARK_START, MARK_END = '\x02', '\x03'
+
+FTS_TRIGGERS_SQL = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON blog_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON blog_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, text ON blog_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END""",
+]
+
+
+def tokenize(text: str) -> list:
+    return re.findall(r'\w+', text.lower())
+
+
+fts_table_exists = False
+
+
+def is_fts_enabled() -> bool:
+    global fts_table_exists
+    if connection.vendor != 'sqlite':
+        return False
+    if not fts_table_exists:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            fts_table_exists = cursor.fetchone() is not None
+    return fts_table_exists
+
+
+def ensure_fts_index(rebuild: bool = False) -> bool:
+    """
+    Create SQLite FTS5 index over post titles and texts with triggers that keep it in sync.
+    Triggers are dropped when migrations remake blog_post table, so they are recreated after every migrate.
+    :params rebuild: refill index from blog_post even if nothing was missing.
+    :return: True if FTS5 index is available.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{FTS_TABLE}_a_'])
+        triggers_amount = cursor.fetchone()[0]
+        try:
+            cursor.execute(
+                f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                    title, text, content='blog_post', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                )""")
+        except OperationalError:
+            return False
+        for trigger_sql in FTS_TRIGGERS_SQL:
+            cursor.execute(trigger_sql)
+        if rebuild or triggers_amount < len(FTS_TRIGGERS_SQL):
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def make_match_expression(terms: list) -> str:
+    """
+    Turn search terms into FTS5 query: all terms must match, the last one as prefix.
+    :params terms: tokenized user query.
+    :return: FTS5 MATCH expression.
+    """
+    quoted_terms = [f'"{term}"' for term in terms]
+    quoted_terms[-1] += '*'
+    return ' '.join(quoted_terms)
+
+
+def highlight(marked_text: str) -> str:
+    return escape(marked_text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def search_with_fts(terms: list, offset: int, limit: int) -> list:
+    with connections[router.db_for_read(Post)].cursor() as cursor:
+        cursor.execute(
+            f"""SELECT rowid, snippet({FTS_TABLE}, 1, %s, %s, '…', %s)
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH %s
+                ORDER BY bm25({FTS_TABLE}, %s, 1.0)
+                LIMIT %s OFFSET %s""",
+            [MARK_START, MARK_END, SNIPPET_WORDS, make_match_expression(terms), TITLE_WEIGHT, limit, offset],
+        )
+        return [(post_id, highlight(snippet)) for post_id, snippet in cursor.fetchall()]
+
+
+def search_post_ids(query: str, limit: int):
+    """
+    Find ids of posts by words from title and text, without ranking and snippets, e.g. for admin.
+    :params query: text typed by editor.
+    :params limit: max amount of results.
+    :return: list of post ids or None if FTS5 index is not available.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    if not is_fts_enabled():
+        return None
+    with connections[router.db_for_read(Post)].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s',
+            [make_match_expression(terms), limit],
+        )
+        return [post_id for post_id, in cursor.fetchall()]
+
+
+class PythonSearchIndex:
+    """In-memory inverted index, used when SQLite FTS5 is not available."""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.terms_for_post = {}
+        self.is_built = False
+
+    def build(self):
+        self.postings.clear()
+        self.terms_for_post.clear()
+        posts = Post.objects.order_by().values_list('id', 'title', 'text').iterator(chunk_size=2000)
+        for post_id, title, text in posts:
+            self.add_post(post_id, title, text)
+        self.is_built = True
+
+    def add_post(self, post_id: int, title: str, text: str):
+        self.remove_post(post_id)
+        weights = Counter(tokenize(text))
+        for term in tokenize(title):
+            weights[term] += TITLE_WEIGHT
+        for term, weight in weights.items():
+            self.postings[term][post_id] = weight
+        self.terms_for_post[post_id] = list(weights)
+
+    def remove_post(self, post_id: int):
+        for term in self.terms_for_post.pop(post_id, []):
+            self.postings[term].pop(post_id, None)
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def search(self, terms: list, offset: int, limit: int) -> list:
+        if not self.is_built:
+            self.build()
+        posts_amount = max(len(self.terms_for_post), 1)
+        scores = None
+        for number, term in enumerate(terms):
+            is_last_term = number == len(terms) - 1
+            matched_terms = [key for key in self.postings if key.startswith(term)] if is_last_term else [term]
+            term_scores = Counter()
+            for matched_term in matched_terms:
+                postings = self.postings.get(matched_term, {})
+                idf = math.log(1 + posts_amount / (1 + len(postings)))
+                for post_id, weight in postings.items():
+                    term_scores[post_id] += weight * idf
+            scores = term_scores if scores is None else Counter(
+                {post_id: score + term_scores[post_id] for post_id, score in scores.items() if post_id in term_scores})
+        ranked_ids = [post_id for post_id, _ in sorted(scores.items(), key=lambda item: (-item[1], -item[0]))]
+        page_ids = ranked_ids[offset:offset + limit]
+        texts = dict(Post.objects.filter(id__in=page_ids).order_by().values_list('id', 'text'))
+        return [(post_id, make_snippet(texts.get(post_id, ''), terms)) for post_id in page_ids]
+
+
+def make_snippet(text: str, terms: list) -> str:
+    words = text.split()
+    first_match = next(
+        (number for number, word in enumerate(words) if any(token.startswith(tuple(terms)) for token in tokenize(word))),
+        0,
+    )
+    start = max(0, first_match - SNIPPET_WORDS // 4)
+    snippet_words = []
+    for word in words[start:start + SNIPPET_WORDS]:
+        if any(token.startswith(tuple(terms)) for token in tokenize(word)):
+            word = f'{MARK_START}{word}{MARK_END}'
+        snippet_words.append(word)
+    prefix = '…' if start else ''
+    suffix = '…' if start + SNIPPET_WORDS < len(words) else ''
+    return highlight(prefix + ' '.join(snippet_words) + suffix)
+
+
+python_index = PythonSearchIndex()
+
+
+def search_posts(query: str, offset: int, limit: int) -> list:
+    """
+    Find posts by words from title and text, best matches first.
+    :params query: text typed by reader.
+    :params offset: amount of results to skip.
+    :params limit: max amount of results.
+    :return: list of post ids with HTML snippets where matched words are highlighted.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    if is_fts_enabled():
+        return search_with_fts(terms, offset, limit)
+    return python_index.search(terms, offset, limit)
@@ -0,0 +1,154 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.db.models.functions import Substr
+
+from blog.models import Post, Tag
+from blog.thumbnails import get_image_sources
+
+TEASER_LENGTH = 200
+IMAGE_COLUMNS = ('image', 'image_width')
+POST_FIELD_COLUMNS = {
+    'title': ('title',),
+    'teaser_text': ('teaser_text',),
+    'text': ('text',),
+    'author': ('author_name',),
+    'comments_amount': ('comments_count',),
+    'likes_amount': ('likes_count',),
+    'image_url': ('image',),
+    'thumbnail_url': IMAGE_COLUMNS,
+    'image_srcset': IMAGE_COLUMNS,
+    'image_webp_srcset': IMAGE_COLUMNS,
+    'published_at': (),
+    'slug': ('slug',),
+    'tags': (),
+    'first_tag_title': (),
+}
+POST_CARD_FIELDS = tuple(field for field in POST_FIELD_COLUMNS if field not in ('text', 'likes_amount'))
+
+
+def serialize_post(post: Post) -> dict:
+    tags = sorted(post.tags.all(), key=lambda tag: tag.title)
+    return {
+        'title': post.title,
+        'teaser_text': post.text[:TEASER_LENGTH],
+        'author': post.author.username,
+        'comments_amount': post.comments_count,
+        'image_url': post.image.url if post.image else None,
+        **get_image_sources(post.image.name, post.image_width),
+        'published_at': post.published_at,
+        'slug': post.slug,
+        'tags': [serialize_tag(tag) for tag in tags],
+        'first_tag_title': tags[0].title,
+    }
+
+
+def select_post_cards(queryset, fields=None):
+    """
+    Turn posts queryset into rows with only the columns the fields need.
+    Teaser is cut in SQL, so full texts are not loaded unless the text field is asked.
+    :params queryset: posts, may be filtered and ordered.
+    :params fields: names of serialized fields from POST_FIELD_COLUMNS, by default fields of post card.
+    :return: values() queryset, rows are passed to serialize_post_cards.
+    """
+    columns = {'id', 'published_at'}.union(*(POST_FIELD_COLUMNS[field] for field in fields or POST_CARD_FIELDS))
+    expressions = {
+        'teaser_text': Substr('text', 1, TEASER_LENGTH),
+        'author_name': F('author__username'),
+    }
+    return queryset.prefetch_related(None).values(
+        *sorted(columns - expressions.keys()),
+        **{name: expression for name, expression in expressions.items() if name in columns},
+    )
+
+
+def get_posts_tags(post_ids) -> dict:
+    """
+    Fetch serialized tags of posts with one query to the through table.
+    :params post_ids: ids of posts.
+    :return: dict with post ids as keys and lists of serialized tags ordered by title as values.
+    """
+    post_tags = Post.tags.through.objects.filter(post_id__in=post_ids).order_by().values_list(
+        'post_id',
+        'tag__title',
+        'tag__posts_count',
+    )
+    tags_for_post = defaultdict(list)
+    for post_id, title, posts_count in post_tags:
+        tags_for_post[post_id].append({'title': title, 'posts_with_tag': posts_count})
+    for tags in tags_for_post.values():
+        tags.sort(key=lambda tag: tag['title'])
+    return tags_for_post
+
+
+def serialize_post_row(row: dict, tags: list) -> dict:
+    image_name = row.get('image')
+    return {
+        'title': row.get('title'),
+        'teaser_text': row.get('teaser_text'),
+        'text': row.get('text'),
+        'author': row.get('author_name'),
+        'comments_amount': row.get('comments_count'),
+        'likes_amount': row.get('likes_count'),
+        'image_url': default_storage.url(image_name) if image_name else None,
+        **get_image_sources(image_name, row.get('image_width')),
+        'published_at': row['published_at'],
+        'slug': row.get('slug'),
+        'tags': tags,
+        'first_tag_title': tags[0]['title'] if tags else None,
+    }
+
+
+def serialize_post_cards(rows, fields=None) -> list:
+    """
+    Serialize posts without making model instances, by default output is the same as of serialize_post.
+    Tags are fetched with one query for all rows and only if the fields include them.
+    :params rows: rows of select_post_cards queryset.
+    :params fields: names of serialized fields, the same as passed to select_post_cards.
+    :return: list of serialized posts in the order of rows.
+    """
+    rows = list(rows)
+    fields = fields or POST_CARD_FIELDS
+    tags_for_post = {}
+    if 'tags' in fields or 'first_tag_title' in fields:
+        tags_for_post = get_posts_tags([row['id'] for row in rows])
+
+    serialized_posts = []
+    for row in rows:
+        serialized_post = serialize_post_row(row, tags_for_post.get(row['id'], []))
+        serialized_posts.append({field: serialized_post[field] for field in fields})
+    return serialized_posts
+
+
+def serialize_post_cards_by_id(post_ids) -> dict:
+    """
+    Serialize post cards of posts picked by ids, e.g. found by search.
+    :params post_ids: ids of posts.
+    :return: dict with post ids as keys and serialized posts as values.
+    """
+    rows = list(select_post_cards(Post.objects.filter(id__in=post_ids).order_by()))
+    return {row['id']: serialized_post for row, serialized_post in zip(rows, serialize_post_cards(rows))}
+
+
+def serialize_post_details(post: Post, tags: list, comments: list) -> dict:
+    return {
+        'title': post.title,
+        'text': post.text,
+        'author': post.author.username,
+        'comments': comments,
+        'comments_amount': post.comments_count,
+        'likes_amount': post.likes_count,
+        'image_url': post.image.url if post.image else None,
+        **get_image_sources(post.image.name, post.image_width),
+        'published_at': post.published_at,
+        'slug': post.slug,
+        'tags': [serialize_tag(tag) for tag in tags],
+    }
+
+
+def serialize_tag(tag: Tag) -> dict:
+    return {
+        'title': tag.title,
+        'posts_with_tag': tag.posts_count,
+    }
@@ -0,0 +1,80 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from blog.caching import get_or_compute
+from blog.models import ArchiveMonth, Post, Tag
+from blog.serializers import select_post_cards, serialize_post_cards, serialize_tag
+
+SIDEBAR_TOP_AMOUNT = 5
+SIDEBAR_ARCHIVE_MONTHS_AMOUNT = 12
+MOST_POPULAR_POSTS_KEY = 'sidebar:most_popular_posts'
+POPULAR_TAGS_KEY = 'sidebar:popular_tags'
+ARCHIVE_MONTHS_KEY = 'sidebar:archive_months'
+
+
+def compute_most_popular_posts() -> list:
+    popular_posts = select_post_cards(Post.objects.get_most_popular_posts(SIDEBAR_TOP_AMOUNT))
+    return serialize_post_cards(popular_posts)
+
+
+def compute_popular_tags() -> list:
+    most_popular_tags = Tag.objects.get_popular_posts()[:SIDEBAR_TOP_AMOUNT]
+    return [serialize_tag(tag) for tag in most_popular_tags]
+
+
+def compute_archive_months() -> list:
+    latest_months = ArchiveMonth.objects.filter(posts_count__gt=0)[:SIDEBAR_ARCHIVE_MONTHS_AMOUNT]
+    return [
+        {
+            'year': archive_month.year,
+            'month': archive_month.month,
+            'date': date(archive_month.year, archive_month.month, 1),
+            'posts_count': archive_month.posts_count,
+        }
+        for archive_month in latest_months
+    ]
+
+
+def get_most_popular_posts(refresh: bool = False) -> list:
+    """
+    Return serialized most liked posts for the sidebar, computed by one worker at a time and kept in cache.
+    :params refresh: recompute the posts even if cached ones are fresh.
+    :return: list of serialized posts.
+    """
+    return get_or_compute(MOST_POPULAR_POSTS_KEY, compute_most_popular_posts, settings.SIDEBAR_CACHE_TIMEOUT, refresh)
+
+
+def get_popular_tags(refresh: bool = False) -> list:
+    """
+    Return serialized tags with the most posts for the sidebar, computed by one worker at a time and kept in cache.
+    :params refresh: recompute the tags even if cached ones are fresh.
+    :return: list of serialized tags.
+    """
+    return get_or_compute(POPULAR_TAGS_KEY, compute_popular_tags, settings.SIDEBAR_CACHE_TIMEOUT, refresh)
+
+
+def get_archive_months(refresh: bool = False) -> list:
+    """
+    Return latest months of archive with amounts of posts for the sidebar, read from the summary table.
+    :params refresh: recompute the months even if cached ones are fresh.
+    :return: list of dicts with year, month, first day of the month and amount of posts.
+    """
+    return get_or_compute(ARCHIVE_MONTHS_KEY, compute_archive_months, settings.SIDEBAR_CACHE_TIMEOUT, refresh)
+
+
+def invalidate_most_popular_posts():
+    cache.delete(MOST_POPULAR_POSTS_KEY)
+
+
+def invalidate_popular_tags():
+    cache.delete(POPULAR_TAGS_KEY)
+
+
+def invalidate_archive_months():
+    cache.delete(ARCHIVE_MONTHS_KEY)
+
+
+def invalidate_sidebar():
+    cache.delete_many([MOST_POPULAR_POSTS_KEY, POPULAR_TAGS_KEY, ARCHIVE_MONTHS_KEY])
@@ -0,0 +1,276 @@
+import logging
+
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from blog.counters import (
+    get_archive_month,
+    increment_archive_month,
+    increment_comments_count,
+    increment_likes_count,
+    increment_posts_count,
+    refresh_archive_months,
+    refresh_comments_count,
+    refresh_likes_count,
+    refresh_posts_count,
+)
+from blog.models import Comment, Post, Tag
+from blog.page_cache import (
+    get_feeds_group,
+    get_index_group,
+    get_post_group,
+    get_tag_group,
+    purge_pages,
+    purge_posts_pages,
+)
+from blog.related import queue_related_posts_refresh
+from blog.search import python_index
+from blog.sidebar import invalidate_archive_months, invalidate_most_popular_posts, invalidate_sidebar
+from blog.thumbnails import make_thumbnails
+
+logger = logging.getLogger(__name__)
+
+M2M_WRITE_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Tag)
+def on_post_or_tag_change(sender, **kwargs):
+    invalidate_sidebar()
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def on_comment_change(sender, **kwargs):
+    invalidate_most_popular_posts()
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def on_likes_change(sender, action, **kwargs):
+    if action in M2M_WRITE_ACTIONS:
+        invalidate_most_popular_posts()
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def on_tags_change(sender, action, **kwargs):
+    if action in M2M_WRITE_ACTIONS:
+        invalidate_sidebar()
+
+
+@receiver(post_save, sender=Comment)
+def on_comment_created(sender, instance, created, **kwargs):
+    if created:
+        increment_comments_count([instance.post_id])
+
+
+@receiver(post_delete, sender=Comment)
+def on_comment_deleted(sender, instance, **kwargs):
+    refresh_comments_count([instance.post_id])
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def update_likes_count(sender, instance, action, pk_set, **kwargs):
+    if action == 'pre_clear' and isinstance(instance, User):
+        instance._cleared_post_ids = list(
+            sender.objects.filter(user=instance).values_list('post_id', flat=True))
+    elif action == 'post_add' and isinstance(instance, Post):
+        increment_likes_count([instance.pk], len(pk_set))
+    elif action == 'post_add':
+        increment_likes_count(pk_set)
+    elif action == 'post_remove':
+        refresh_likes_count([instance.pk] if isinstance(instance, Post) else pk_set)
+    elif action == 'post_clear':
+        refresh_likes_count([instance.pk] if isinstance(instance, Post) else instance._cleared_post_ids)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_posts_count(sender, instance, action, pk_set, **kwargs):
+    if action == 'pre_clear' and isinstance(instance, Post):
+        instance._cleared_tag_ids = list(
+            sender.objects.filter(post=instance).values_list('tag_id', flat=True))
+    elif action == 'post_add' and isinstance(instance, Tag):
+        increment_posts_count([instance.pk], len(pk_set))
+    elif action == 'post_add':
+        increment_posts_count(pk_set)
+    elif action == 'post_remove':
+        refresh_posts_count([instance.pk] if isinstance(instance, Tag) else pk_set)
+    elif action == 'post_clear':
+        refresh_posts_count([instance.pk] if isinstance(instance, Tag) else instance._cleared_tag_ids)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_tags(sender, instance, **kwargs):
+    instance._deleted_tags = list(instance.tags.values_list('id', 'title'))
+
+
+@receiver(post_delete, sender=Post)
+def on_post_deleted(sender, instance, **kwargs):
+    tag_ids = [tag_id for tag_id, _ in instance._deleted_tags]
+    refresh_posts_count(tag_ids)
+    purge_pages(
+        get_index_group(),
+        get_post_group(instance.slug),
+        *[get_tag_group(tag_title) for _, tag_title in instance._deleted_tags],
+    )
+
+
+@receiver(post_save, sender=Post)
+def update_archive_months(sender, instance, created, **kwargs):
+    archive_month = get_archive_month(instance.published_at)
+    stored_published_at = getattr(instance, '_stored_published_at', None)
+    if created:
+        increment_archive_month(*archive_month)
+    elif stored_published_at is None:
+        refresh_archive_months([archive_month])
+    elif get_archive_month(stored_published_at) != archive_month:
+        refresh_archive_months([archive_month, get_archive_month(stored_published_at)])
+    else:
+        return
+    invalidate_archive_months()
+
+
+@receiver(post_delete, sender=Post)
+def remove_deleted_post_from_archive(sender, instance, **kwargs):
+    refresh_archive_months([get_archive_month(instance.published_at)])
+    invalidate_archive_months()
+
+
+@receiver(pre_delete, sender=User)
+def remember_liked_posts(sender, instance, **kwargs):
+    instance._liked_post_ids = list(instance.liked_posts.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def on_user_deleted(sender, instance, **kwargs):
+    refresh_likes_count(instance._liked_post_ids)
+
+
+@receiver(pre_save, sender=Post)
+def remember_stored_post(sender, instance, raw, **kwargs):
+    instance._stored_published_at = None
+    instance._stored_slug = None
+    if raw or not instance.pk:
+        return
+    stored_post = Post.objects.filter(pk=instance.pk).values('image', 'published_at', 'slug').first() or {}
+    instance._stored_published_at = stored_post.get('published_at')
+    instance._stored_slug = stored_post.get('slug')
+    if stored_post.get('image') != instance.image.name:
+        instance.image_width = None
+
+
+@receiver(post_save, sender=Post)
+def make_uploaded_image_thumbnails(sender, instance, raw, **kwargs):
+    if raw or not instance.image or instance.image_width:
+        return
+    try:
+        instance.image_width = make_thumbnails(instance.image.name)
+    except (OSError, ValueError):
+        logger.warning('Could not make thumbnails of %s', instance.image.name, exc_info=True)
+        return
+    Post.objects.filter(pk=instance.pk).update(image_width=instance.image_width)
+
+
+@receiver(post_save, sender=Post)
+def purge_saved_post_pages(sender, instance, **kwargs):
+    purge_posts_pages([instance.pk])
+    stored_slug = getattr(instance, '_stored_slug', None)
+    if stored_slug and stored_slug != instance.slug:
+        purge_pages(get_post_group(stored_slug))
+
+
+@receiver([post_save, post_delete], sender=Post)
+def purge_feeds(sender, **kwargs):
+    purge_pages(get_feeds_group())
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def purge_commented_post_pages(sender, instance, **kwargs):
+    purge_posts_pages([instance.post_id])
+
+
+@receiver(pre_save, sender=Tag)
+def remember_stored_tag(sender, instance, raw, **kwargs):
+    instance._stored_title = None
+    if raw or not instance.pk:
+        return
+    instance._stored_title = Tag.objects.filter(pk=instance.pk).values_list('title', flat=True).first()
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_posts(sender, instance, **kwargs):
+    instance._tagged_post_slugs = list(instance.posts.order_by().values_list('slug', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def purge_tag_pages(sender, instance, **kwargs):
+    """Pages and cards of the tag posts link to the tag by title, so they are purged too."""
+    tagged_post_slugs = getattr(instance, '_tagged_post_slugs', None)
+    if tagged_post_slugs is None:
+        tagged_post_slugs = instance.posts.order_by().values_list('slug', flat=True)
+    purge_pages(
+        get_tag_group(instance.title),
+        get_index_group(),
+        *[get_post_group(slug) for slug in tagged_post_slugs],
+    )
+    stored_title = getattr(instance, '_stored_title', None)
+    if stored_title and stored_title != instance.title:
+        purge_pages(get_tag_group(stored_title))
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def purge_liked_post_pages(sender, instance, action, pk_set, **kwargs):
+    if action in M2M_WRITE_ACTIONS:
+        if isinstance(instance, Post):
+            purge_posts_pages([instance.pk], with_tags=False)
+        elif action == 'post_clear':
+            purge_posts_pages(instance._cleared_post_ids, with_tags=False)
+        else:
+            purge_posts_pages(pk_set, with_tags=False)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def purge_tagged_post_pages(sender, instance, action, pk_set, **kwargs):
+    if action == 'pre_clear' and isinstance(instance, Tag):
+        instance._cleared_post_ids = list(
+            sender.objects.filter(tag=instance).values_list('post_id', flat=True))
+    if action not in M2M_WRITE_ACTIONS:
+        return
+    if isinstance(instance, Tag):
+        purge_pages(get_tag_group(instance.title))
+        purge_posts_pages(pk_set if action != 'post_clear' else instance._cleared_post_ids)
+        return
+    tag_ids = pk_set if action != 'post_clear' else instance._cleared_tag_ids
+    tag_titles = Tag.objects.filter(id__in=tag_ids).order_by().values_list('title', flat=True)
+    purge_pages(*[get_tag_group(tag_title) for tag_title in tag_titles])
+    purge_posts_pages([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def update_python_search_index(sender, instance, **kwargs):
+    if python_index.is_built:
+        python_index.add_post(instance.pk, instance.title, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_python_search_index(sender, instance, **kwargs):
+    if python_index.is_built:
+        python_index.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def queue_new_post_related_posts(sender, instance, created, **kwargs):
+    if created:
+        queue_related_posts_refresh([instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+def queue_changed_posts_related_posts(sender, instance, action, pk_set, **kwargs):
+    if action not in M2M_WRITE_ACTIONS:
+        return
+    if isinstance(instance, Post):
+        queue_related_posts_refresh([instance.pk])
+    elif action == 'post_clear':
+        queue_related_posts_refresh(instance._cleared_post_ids)
+    else:
+        queue_related_posts_refresh(pk_set)
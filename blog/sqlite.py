@@ -0,0 +1,42 @@
+import sqlite3
+
+from django.conf import settings
+
+
+def get_sqlite_pragmas() -> dict:
+    """
+    Get pragmas of the production profile.
+    :return: dict with pragma names as keys, empty if the profile is off.
+    """
+    if not settings.SQLITE_PRODUCTION_MODE:
+        return {}
+    return settings.SQLITE_PRAGMAS
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = get_sqlite_pragmas()
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def copy_sqlite_database(source_path: str, target_path: str, journal_mode: str = None):
+    """
+    Copy the database with the online backup API, so WAL of the source is included.
+    :params source_path: path to the database file.
+    :params target_path: path to the copy, it is overwritten.
+    :params journal_mode: journal mode of the copy, e.g. DELETE or WAL, by default the one of the source.
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+        if journal_mode:
+            target.execute(f'PRAGMA journal_mode = {journal_mode}')
+    finally:
+        target.close()
+        source.close()
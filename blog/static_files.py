@@ -0,0 +1,114 @@
+import gzip
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.xml', '.html', '.map', '.ttf', '.eot')
+MIN_COMPRESSED_SIZE = 256
+ENCODINGS = (
+    ('br', '.br'),
+    ('gzip', '.gz'),
+)
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def compress(content: bytes) -> dict:
+    """
+    Compress file content with every supported encoding.
+    :params content: file content.
+    :return: dict with file suffixes as keys and compressed content as values, only smaller variants are kept.
+    """
+    variants = {
+        '.gz': gzip.compress(content, compresslevel=9, mtime=0),
+        '.br': brotli.compress(content, quality=11),
+    }
+    return {suffix: compressed for suffix, compressed in variants.items() if len(compressed) < len(content) * 0.95}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Fingerprint static files, rewrite references in CSS and save gzip and brotli siblings of text files."""
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except (ValueError, SuspiciousFileOperation):
+            if content is not None:
+                raise
+            # vendor styles refer to files that are not shipped, such links stay as they are
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            if not hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            with self.open(hashed_name) as static_file:
+                content = static_file.read()
+            if len(content) < MIN_COMPRESSED_SIZE:
+                continue
+            for suffix, compressed in compress(content).items():
+                compressed_name = f'{hashed_name}{suffix}'
+                if self.exists(compressed_name):
+                    self.delete(compressed_name)
+                self._save(compressed_name, ContentFile(compressed))
+                yield hashed_name, compressed_name, True
+
+
+@lru_cache()
+def get_immutable_names() -> frozenset:
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def choose_encoding(accept_encoding: str, file_path: str):
+    """
+    Pick the best precompressed variant the client accepts.
+    :params accept_encoding: value of Accept-Encoding header.
+    :params file_path: path to the original file.
+    :return: tuple of encoding and path to the variant, encoding is None for the original.
+    """
+    accepted_encodings = {
+        encoding.split(';')[0].strip()
+        for encoding in accept_encoding.split(',')
+        if not re.search(r';\s*q=0(\.0*)?\s*$', encoding)
+    }
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted_encodings and os.path.exists(f'{file_path}{suffix}'):
+            return encoding, f'{file_path}{suffix}'
+    return None, file_path
+
+
+def serve_static(request, path: str) -> FileResponse:
+    """
+    Serve collected static file, precompressed if the client accepts it.
+    Fingerprinted files never change, so they are cached by browsers for a year.
+    """
+    try:
+        file_path = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404('Static file not found')
+    if not os.path.isfile(file_path):
+        raise Http404('Static file not found')
+
+    encoding, served_path = choose_encoding(request.headers.get('Accept-Encoding', ''), file_path)
+    content_type, _ = mimetypes.guess_type(file_path)
+    response = FileResponse(open(served_path, 'rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    if path in get_immutable_names():
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.STATIC_CACHE_TIMEOUT}'
+    return response
@@ -0,0 +1,21 @@
+from django import template
+
+from blog.page_cache import get_groups_versions, get_post_group
+
+register = template.Library()
+
+
+@register.simple_tag
+def get_posts_versions(posts) -> dict:
+    """
+    Get versions of posts cards for fragments cache keys, the version changes with the post, its comments and likes.
+    :params posts: serialized posts with slugs.
+    :return: dict with slugs as keys and versions as values, in the order of posts.
+    """
+    versions = get_groups_versions([get_post_group(post['slug']) for post in posts])
+    return {post['slug']: versions[get_post_group(post['slug'])] for post in posts}
+
+
+@register.filter
+def get_item(mapping: dict, key):
+    return mapping.get(key)
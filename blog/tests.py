@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+
+from django.test import SimpleTestCase
+
+from blog.pagination import decode_cursor, encode_cursor
+
+
+class CursorTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        published_at = datetime(2021, 3, 4, 5, 6, 7, 890, tzinfo=timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor(published_at, 42)), (published_at, 42))
+
+    def test_round_trip_before_epoch(self):
+        published_at = datetime(1000, 1, 1, tzinfo=timezone.utc)
+        cursor = encode_cursor(published_at, 5)
+        self.assertEqual(cursor, '-30610224000000000-5')
+        self.assertEqual(decode_cursor(cursor), (published_at, 5))
+
+    def test_broken_cursor(self):
+        for cursor in ('', '-', '12', 'a-1', '1-a', '1--1', '99999999999999999999-1'):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
@@ -0,0 +1,91 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+THUMBNAIL_FORMATS = {
+    'webp': {'format': 'WEBP', 'extension': 'webp', 'options': {'method': 4}},
+    'jpeg': {'format': 'JPEG', 'extension': 'jpg', 'options': {'optimize': True, 'progressive': True}},
+}
+
+
+def get_thumbnail_name(image_name: str, width: int, thumbnail_format: str) -> str:
+    """Name of the thumbnail keeps the whole name of the original, so a.png and a.jpg get different thumbnails."""
+    extension = THUMBNAIL_FORMATS[thumbnail_format]['extension']
+    return f'{settings.THUMBNAIL_DIR}/{width}/{image_name}.{extension}'
+
+
+def get_thumbnail_widths(image_width: int) -> list:
+    """
+    Pick widths of thumbnails for the image, images are never upscaled.
+    :params image_width: width of the original image.
+    :return: list of widths smaller than the original.
+    """
+    return [width for width in settings.THUMBNAIL_WIDTHS if width < image_width]
+
+
+def make_thumbnails(image_name: str, force: bool = False) -> int:
+    """
+    Save resized WebP and JPEG copies of the image next to the other media files.
+    Existing thumbnails are kept unless forced, so the function is cheap to call again.
+    :params image_name: name of the original image in the media storage.
+    :params force: recreate existing thumbnails.
+    :return: width of the original image.
+    """
+    with default_storage.open(image_name) as image_file:
+        image = Image.open(image_file)
+        image.load()
+    image_width, image_height = image.size
+
+    for width in get_thumbnail_widths(image_width):
+        resized_image = None
+        for thumbnail_format, format_options in THUMBNAIL_FORMATS.items():
+            thumbnail_name = get_thumbnail_name(image_name, width, thumbnail_format)
+            if default_storage.exists(thumbnail_name):
+                if not force:
+                    continue
+                default_storage.delete(thumbnail_name)
+
+            if resized_image is None:
+                height = max(1, round(image_height * width / image_width))
+                resized_image = image.convert('RGB').resize((width, height), Image.LANCZOS)
+            buffer = BytesIO()
+            resized_image.save(
+                buffer,
+                format_options['format'],
+                quality=settings.THUMBNAIL_QUALITY,
+                **format_options['options'],
+            )
+            default_storage.save(thumbnail_name, ContentFile(buffer.getvalue()))
+    return image_width
+
+
+def get_image_sources(image_name: str, image_width: int) -> dict:
+    """
+    Build srcset-ready sources of the image.
+    :params image_name: name of the original image in the media storage.
+    :params image_width: width of the original image, None if thumbnails are not made yet.
+    :return: dict with the smallest JPEG thumbnail url and srcset strings for WebP and JPEG,
+    the original is listed only in the JPEG one, since it is not WebP.
+    """
+    if not image_name:
+        return {'thumbnail_url': None, 'image_srcset': '', 'image_webp_srcset': ''}
+    image_url = default_storage.url(image_name)
+    if not image_width:
+        return {'thumbnail_url': image_url, 'image_srcset': '', 'image_webp_srcset': ''}
+
+    widths = get_thumbnail_widths(image_width)
+    sources = {
+        thumbnail_format: [
+            f'{default_storage.url(get_thumbnail_name(image_name, width, thumbnail_format))} {width}w'
+            for width in widths
+        ]
+        for thumbnail_format in THUMBNAIL_FORMATS
+    }
+    return {
+        'thumbnail_url': default_storage.url(get_thumbnail_name(image_name, widths[0], 'jpeg')) if widths else image_url,
+        'image_srcset': ', '.join(sources['jpeg'] + [f'{image_url} {image_width}w']),
+        'image_webp_srcset': ', '.join(sources['webp']),
+    }
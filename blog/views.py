@@ -1,110 +1,436 @@
+from datetime import date
+from functools import partial
+from urllib.parse import urlencode
+
 from django.core.handlers.wsgi import WSGIRequest
-from django.db.models import Prefetch, Count
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import condition, require_POST
 
+from blog.concurrency import gather_queries, render_async, run_query
+from blog.conditional import (
+    async_condition,
+    feeds_etag,
+    post_etag,
+    post_last_modified,
+    tag_etag,
+    tag_last_modified,
+)
+from blog.feeds import (
+    FEED_TITLE,
+    generate_atom_feed,
+    generate_rss_feed,
+    generate_sitemap_index,
+    generate_sitemap_shard,
+    open_cached_file,
+)
+from blog.likes import like_post, likes_buffer, unlike_post
 from blog.models import Comment, Post, Tag
+from blog.page_cache import (
+    cache_page_for_anonymous,
+    get_feeds_group,
+    get_group_version,
+    get_index_group,
+    get_post_group,
+    get_tag_group,
+)
+from blog.pagination import encode_cursor, paginate_by_keyset, paginate_values_by_keyset
+from blog.related import get_related_post_ids
+from blog.search import search_posts
+from blog.serializers import select_post_cards, serialize_post_cards, serialize_post_cards_by_id, serialize_post_details
+from blog.sidebar import get_archive_months, get_most_popular_posts, get_popular_tags
+
+COMMENTS_PER_PAGE = 20
+
+
+def get_feed_page(posts, page: int, after: str, before: str, url_name: str, url_kwargs: dict = None) -> dict:
+    """
+    Fetch newest-first page of post cards with links to the neighbouring pages.
+    :params posts: posts of the feed.
+    :params page: page number.
+    :params after: cursor of the last post on the previous page.
+    :params before: cursor of the first post on the next page.
+    :params url_name: name of the feed url, it takes page number.
+    :params url_kwargs: other arguments of the feed url.
+    :return: dict with serialized posts and urls of previous and next pages.
+    """
+    url_kwargs = url_kwargs or {}
+    posts_page = paginate_by_keyset(select_post_cards(posts), page, after=after, before=before)
+    page_posts = posts_page['objects']
+    if not page_posts and page > 1:
+        raise Http404('Page not found')
+
+    previous_page_url, next_page_url = None, None
+    if posts_page['has_previous']:
+        first_post = page_posts[0]
+        cursor = encode_cursor(first_post['published_at'], first_post['id'])
+        previous_page_url = f"{reverse(url_name, kwargs={**url_kwargs, 'page': page - 1})}?before={cursor}"
+    if posts_page['has_next']:
+        last_post = page_posts[-1]
+        cursor = encode_cursor(last_post['published_at'], last_post['id'])
+        next_page_url = f"{reverse(url_name, kwargs={**url_kwargs, 'page': page + 1})}?after={cursor}"
+
+    return {
+        'page_posts': serialize_post_cards(page_posts),
+        'previous_page_url': previous_page_url,
+        'next_page_url': next_page_url,
+    }
 
 
-def index(request: WSGIRequest) -> HttpResponse:
-    top_obj_amount = 5
-    posts_prefetch = Prefetch('tags', queryset=Tag.objects.annotate(posts_amount=Count('posts')))
+def get_index_posts(page: int, after: str = None, before: str = None) -> dict:
+    return get_feed_page(Post.objects.all(), page, after, before, 'index')
 
-    most_popular_posts = Post.objects.get_most_popular_posts(posts_prefetch, top_obj_amount)
-    fresh_posts = Post.objects.prefetch_related('author').prefetch_related(posts_prefetch). \
-        count_comments().order_by('-published_at')
-    most_fresh_posts = list(fresh_posts)[:top_obj_amount]
 
-    most_popular_tags = Tag.objects.get_popular_posts()[:top_obj_amount]
+@cache_page_for_anonymous(get_index_group)
+def index(request: WSGIRequest, page: int = 1) -> HttpResponse:
+    if page < 1:
+        raise Http404('Page not found')
 
     context = {
-        'most_popular_posts': [serialize_post(post) for post in most_popular_posts],
-        'page_posts': [serialize_post(post) for post in most_fresh_posts],
-        'popular_tags': [serialize_tag(tag) for tag in most_popular_tags],
+        'most_popular_posts': get_most_popular_posts(),
+        **get_index_posts(page, request.GET.get('after'), request.GET.get('before')),
+        'popular_tags': get_popular_tags(),
+        'archive_months': get_archive_months(),
+        'page_number': page,
     }
     return render(request, 'index.html', context)
 
 
-def post_detail(request: WSGIRequest, slug: str) -> HttpResponse:
-    top_obj_amount = 5
-    posts_prefetch = Prefetch('tags', queryset=Tag.objects.annotate(posts_amount=Count('posts')))
-    serialized_comments = []
-
-    most_popular_posts = Post.objects.get_most_popular_posts(posts_prefetch, top_obj_amount)
-    post = Post.objects.prefetch_related('author').count_likes().get(slug=slug)
-    comments = Comment.objects.select_related('author').filter(post=post)
-    most_popular_tags = Tag.objects.get_popular_posts()[:top_obj_amount]
-    related_tags = post.tags.get_popular_posts()
-
-    for comment in comments:
-        serialized_comments.append({
-            'text': comment.text,
-            'published_at': comment.published_at,
-            'author': comment.author.username,
-        })
-
-    serialized_post = {
-        'title': post.title,
-        'text': post.text,
-        'author': post.author.username,
-        'comments': serialized_comments,
-        'likes_amount': post.likes_count,
-        'image_url': post.image.url if post.image else None,
-        'published_at': post.published_at,
-        'slug': post.slug,
-        'tags': [serialize_tag(tag) for tag in related_tags],
+@cache_page_for_anonymous(get_index_group)
+async def async_index(request: WSGIRequest, page: int = 1) -> HttpResponse:
+    if page < 1:
+        raise Http404('Page not found')
+
+    index_posts, most_popular_posts, popular_tags, archive_months = await gather_queries(
+        partial(get_index_posts, page, request.GET.get('after'), request.GET.get('before')),
+        get_most_popular_posts,
+        get_popular_tags,
+        get_archive_months,
+    )
+    context = {
+        'most_popular_posts': most_popular_posts,
+        **index_posts,
+        'popular_tags': popular_tags,
+        'archive_months': archive_months,
+        'page_number': page,
     }
+    return await render_async(request, 'index.html', context)
+
+
+def get_post(slug: str) -> Post:
+    return get_object_or_404(Post.objects.prefetch_related('author'), slug=slug)
+
+
+def get_post_tags(post: Post) -> list:
+    return sorted(post.tags.order_by(), key=lambda tag: -tag.posts_count)
+
+
+def get_related_posts_cards(post_id: int) -> list:
+    related_ids = get_related_post_ids(post_id)
+    post_card_for_id = serialize_post_cards_by_id(related_ids)
+    return [post_card_for_id[related_id] for related_id in related_ids if related_id in post_card_for_id]
+
+
+def is_liked_by(post_id: int, user) -> bool:
+    return user.is_authenticated and Post.likes.through.objects.filter(post_id=post_id, user_id=user.id).exists()
+
+
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+@cache_page_for_anonymous(get_post_group)
+def post_detail(request: WSGIRequest, slug: str) -> HttpResponse:
+    post = get_post(slug)
+    comments_page = get_comments_page(post.id)
+
     context = {
-        'post': serialized_post,
-        'popular_tags': [serialize_tag(tag) for tag in most_popular_tags],
-        'most_popular_posts': [serialize_post(post) for post in most_popular_posts],
+        'post': serialize_post_details(post, get_post_tags(post), comments_page['comments']),
+        'is_liked': is_liked_by(post.id, request.user),
+        'popular_tags': get_popular_tags(),
+        'archive_months': get_archive_months(),
+        'most_popular_posts': get_most_popular_posts(),
+        'related_posts': get_related_posts_cards(post.id),
+        'next_comments_url': get_next_comments_url(slug, comments_page['next_cursor']),
     }
     return render(request, 'post-details.html', context)
 
 
-def tag_filter(request: WSGIRequest, tag_title: str) -> HttpResponse:
-    top_obj_amount = 5
-    posts_prefetch = Prefetch('tags', queryset=Tag.objects.annotate(posts_amount=Count('posts')))
+@async_condition(etag_func=post_etag, last_modified_func=post_last_modified)
+@cache_page_for_anonymous(get_post_group)
+async def async_post_detail(request: WSGIRequest, slug: str) -> HttpResponse:
+    post = await run_query(get_post, slug)
+    (
+        related_tags, comments_page, is_liked, popular_tags, archive_months, most_popular_posts, related_posts,
+    ) = await gather_queries(
+        partial(get_post_tags, post),
+        partial(get_comments_page, post.id),
+        partial(is_liked_by, post.id, request.user),
+        get_popular_tags,
+        get_archive_months,
+        get_most_popular_posts,
+        partial(get_related_posts_cards, post.id),
+    )
+
+    context = {
+        'post': serialize_post_details(post, related_tags, comments_page['comments']),
+        'is_liked': is_liked,
+        'popular_tags': popular_tags,
+        'archive_months': archive_months,
+        'most_popular_posts': most_popular_posts,
+        'related_posts': related_posts,
+        'next_comments_url': get_next_comments_url(slug, comments_page['next_cursor']),
+    }
+    return await render_async(request, 'post-details.html', context)
 
-    tags_with_posts = Tag.objects.get_popular_posts()
-    tag = tags_with_posts.get(title=tag_title)
 
-    most_popular_posts = Post.objects.get_most_popular_posts(posts_prefetch, top_obj_amount)
-    most_popular_tags = tags_with_posts[:top_obj_amount]
-    related_posts = tag.posts.prefetch_related('author').prefetch_related(posts_prefetch).count_comments()[:20]
+@cache_page_for_anonymous(get_post_group)
+def post_comments(request: WSGIRequest, slug: str) -> HttpResponse:
+    post_ids = Post.objects.filter(slug=slug).order_by().values_list('id', flat=True)[:1]
+    if not post_ids:
+        raise Http404('Post not found')
+    post_id = post_ids[0]
 
+    comments_page = get_comments_page(post_id, after=request.GET.get('after'))
     context = {
+        'comments': comments_page['comments'],
+        'next_comments_url': get_next_comments_url(slug, comments_page['next_cursor']),
+    }
+    return render(request, 'comments-page.html', context)
+
+
+@require_POST
+def toggle_like(request: WSGIRequest, slug: str) -> HttpResponse:
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Login required'}, status=403)
+
+    post = get_object_or_404(Post.objects.only('id', 'slug', 'likes_count'), slug=slug)
+    if request.POST.get('action') == 'unlike':
+        unlike_post(post.id, request.user.id)
+        liked = False
+    else:
+        like_post(post.id, request.user.id)
+        liked = True
+
+    if request.headers.get('x-requested-with') != 'XMLHttpRequest':
+        return redirect('post_detail', slug=post.slug)
+    return JsonResponse({
+        'liked': liked,
+        'likes_amount': post.likes_count + likes_buffer.get_delta(post.id),
+    })
+
+
+def get_comments_page(post_id: int, after: str = None, per_page: int = COMMENTS_PER_PAGE) -> dict:
+    comments = Comment.objects.filter(post_id=post_id).values('id', 'text', 'published_at', 'author__username')
+    comments_page = paginate_values_by_keyset(comments, after=after, per_page=per_page)
+    serialized_comments = [
+        {
+            'text': comment['text'],
+            'published_at': comment['published_at'],
+            'author': comment['author__username'],
+        }
+        for comment in comments_page['objects']
+    ]
+    return {'comments': serialized_comments, 'next_cursor': comments_page['next_cursor']}
+
+
+def get_next_comments_url(slug: str, next_cursor: str):
+    if not next_cursor:
+        return None
+    return f"{reverse('post_comments', kwargs={'slug': slug})}?after={next_cursor}"
+
+
+def get_tag_posts(tag_title: str) -> dict:
+    tag = get_object_or_404(Tag, title=tag_title)
+    related_posts = select_post_cards(Post.objects.filter_by_tag(tag))[:20]
+    return {
         'tag': tag.title,
-        'popular_tags': [serialize_tag(tag) for tag in most_popular_tags],
-        'posts': [serialize_post(post) for post in related_posts],
-        'most_popular_posts': [serialize_post(post) for post in most_popular_posts],
+        'posts': serialize_post_cards(related_posts),
+    }
+
+
+@condition(etag_func=tag_etag, last_modified_func=tag_last_modified)
+@cache_page_for_anonymous(get_tag_group)
+def tag_filter(request: WSGIRequest, tag_title: str) -> HttpResponse:
+    context = {
+        **get_tag_posts(tag_title),
+        'popular_tags': get_popular_tags(),
+        'archive_months': get_archive_months(),
+        'most_popular_posts': get_most_popular_posts(),
     }
 
     return render(request, 'posts-list.html', context)
 
 
-def contacts(request: WSGIRequest) -> HttpResponse:
-    # позже здесь будет код для статистики заходов на эту страницу
-    # и для записи фидбека
-    return render(request, 'contacts.html', {})
+@async_condition(etag_func=tag_etag, last_modified_func=tag_last_modified)
+@cache_page_for_anonymous(get_tag_group)
+async def async_tag_filter(request: WSGIRequest, tag_title: str) -> HttpResponse:
+    tag_posts, popular_tags, archive_months, most_popular_posts = await gather_queries(
+        partial(get_tag_posts, tag_title),
+        get_popular_tags,
+        get_archive_months,
+        get_most_popular_posts,
+    )
+    context = {
+        **tag_posts,
+        'popular_tags': popular_tags,
+        'archive_months': archive_months,
+        'most_popular_posts': most_popular_posts,
+    }
+
+    return await render_async(request, 'posts-list.html', context)
 
 
-def serialize_post(post: Post) -> dict:
+def get_archive_posts(year: int, month: int, page: int, after: str = None, before: str = None) -> dict:
+    """
+    Fetch page of posts published in year or month, newest first.
+    :params year: year of the archive.
+    :params month: month of the archive or None for the whole year.
+    :return: dict with serialized posts, urls of neighbouring pages and archive period.
+    """
+    if month:
+        posts = Post.objects.filter_by_month(year, month)
+        url_kwargs = {'year': year, 'month': month}
+    else:
+        posts = Post.objects.filter_by_year(year)
+        url_kwargs = {'year': year}
+    feed_page = get_feed_page(posts, page, after, before, 'archive', url_kwargs)
+    if not feed_page['page_posts']:
+        raise Http404('Archive is empty')
     return {
-        'title': post.title,
-        'teaser_text': post.text[:200],
-        'author': post.author.username,
-        'comments_amount': post.comments_count,
-        'image_url': post.image.url if post.image else None,
-        'published_at': post.published_at,
-        'slug': post.slug,
-        'tags': [serialize_tag(tag) for tag in post.tags.all()],
-        'first_tag_title': post.tags.all()[0].title,
+        'posts': feed_page['page_posts'],
+        'previous_page_url': feed_page['previous_page_url'],
+        'next_page_url': feed_page['next_page_url'],
+        'archive': {'year': year, 'month': month, 'date': date(year, month or 1, 1)},
     }
 
 
-def serialize_tag(tag: Tag) -> dict:
-    return {
-        'title': tag.title,
-        'posts_with_tag': tag.posts_amount,
+def check_archive_period(year: int, month: int, page: int):
+    if not 1 <= year <= 9998 or month is not None and not 1 <= month <= 12 or page < 1:
+        raise Http404('Archive not found')
+
+
+@cache_page_for_anonymous(get_index_group)
+def archive(request: WSGIRequest, year: int, month: int = None, page: int = 1) -> HttpResponse:
+    check_archive_period(year, month, page)
+    archive_posts = get_archive_posts(year, month, page, request.GET.get('after'), request.GET.get('before'))
+
+    context = {
+        **archive_posts,
+        'popular_tags': get_popular_tags(),
+        'archive_months': get_archive_months(),
+        'most_popular_posts': get_most_popular_posts(),
+        'page_number': page,
     }
+    return render(request, 'posts-list.html', context)
+
+
+@cache_page_for_anonymous(get_index_group)
+async def async_archive(request: WSGIRequest, year: int, month: int = None, page: int = 1) -> HttpResponse:
+    check_archive_period(year, month, page)
+    archive_posts, popular_tags, archive_months, most_popular_posts = await gather_queries(
+        partial(get_archive_posts, year, month, page, request.GET.get('after'), request.GET.get('before')),
+        get_popular_tags,
+        get_archive_months,
+        get_most_popular_posts,
+    )
+
+    context = {
+        **archive_posts,
+        'popular_tags': popular_tags,
+        'archive_months': archive_months,
+        'most_popular_posts': most_popular_posts,
+        'page_number': page,
+    }
+    return await render_async(request, 'posts-list.html', context)
+
+
+def search(request: WSGIRequest) -> HttpResponse:
+    per_page = 10
+    query = request.GET.get('q', '').strip()
+    page = request.GET.get('page', '1')
+    page = int(page) if page.isdigit() and int(page) > 0 else 1
+
+    found_posts = search_posts(query, (page - 1) * per_page, per_page + 1)
+    snippet_for_id = dict(found_posts[:per_page])
+    post_card_for_id = serialize_post_cards_by_id(snippet_for_id)
+
+    serialized_posts = []
+    for post_id, snippet in snippet_for_id.items():
+        if post_id in post_card_for_id:
+            serialized_posts.append({**post_card_for_id[post_id], 'snippet': snippet})
+
+    search_url = reverse('search')
+    previous_page_url = f'{search_url}?{urlencode({"q": query, "page": page - 1})}' if page > 1 else None
+    next_page_url = None
+    if len(found_posts) > per_page:
+        next_page_url = f'{search_url}?{urlencode({"q": query, "page": page + 1})}'
+
+    context = {
+        'query': query,
+        'posts': serialized_posts,
+        'popular_tags': get_popular_tags(),
+        'archive_months': get_archive_months(),
+        'most_popular_posts': get_most_popular_posts(),
+        'page_number': page,
+        'previous_page_url': previous_page_url,
+        'next_page_url': next_page_url,
+    }
+    return render(request, 'posts-list.html', context)
+
+
+def serve_generated_xml(request: WSGIRequest, version: int, chunks, content_type: str) -> FileResponse:
+    """
+    Serve XML document generated once per version of data and then streamed from file.
+    :params version: version of data, the document is generated again when it changes.
+    :params chunks: lazy iterable of document parts, not consumed if the document is ready.
+    :params content_type: content type of the document.
+    :return: streaming response.
+    """
+    cached_file = open_cached_file(request.build_absolute_uri(request.path), version, chunks)
+    return FileResponse(cached_file, content_type=f'{content_type}; charset=utf-8')
+
+
+def get_base_url(request: WSGIRequest) -> str:
+    return request.build_absolute_uri('/').rstrip('/')
+
+
+@condition(etag_func=feeds_etag)
+def sitemap_index(request: WSGIRequest) -> FileResponse:
+    chunks = generate_sitemap_index(get_base_url(request))
+    return serve_generated_xml(request, get_group_version(get_feeds_group()), chunks, 'application/xml')
+
+
+@condition(etag_func=feeds_etag)
+def sitemap_shard(request: WSGIRequest, shard: int) -> FileResponse:
+    if shard < 1:
+        raise Http404('Sitemap not found')
+    chunks = generate_sitemap_shard(get_base_url(request), shard)
+    return serve_generated_xml(request, get_group_version(get_feeds_group()), chunks, 'application/xml')
+
+
+def serve_feed(request: WSGIRequest, feed_format: str, title: str, link: str, posts, version: int) -> FileResponse:
+    base_url = get_base_url(request)
+    if feed_format == 'atom':
+        chunks = generate_atom_feed(base_url, title, link, posts, request.build_absolute_uri(request.path))
+        return serve_generated_xml(request, version, chunks, 'application/atom+xml')
+    chunks = generate_rss_feed(base_url, title, link, posts)
+    return serve_generated_xml(request, version, chunks, 'application/rss+xml')
+
+
+@condition(etag_func=feeds_etag)
+def feed(request: WSGIRequest, feed_format: str) -> FileResponse:
+    version = get_group_version(get_feeds_group())
+    return serve_feed(request, feed_format, FEED_TITLE, reverse('index'), Post.objects.all(), version)
+
+
+@condition(etag_func=tag_etag, last_modified_func=tag_last_modified)
+def tag_feed(request: WSGIRequest, tag_title: str, feed_format: str) -> FileResponse:
+    tag = get_object_or_404(Tag, title=tag_title)
+    version = get_group_version(get_tag_group(tag_title))
+    link = reverse('tag_filter', kwargs={'tag_title': tag.title})
+    return serve_feed(request, feed_format, f'{FEED_TITLE}: #{tag.title}', link, Post.objects.filter_by_tag(tag), version)
+
+
+def contacts(request: WSGIRequest) -> HttpResponse:
+    # позже здесь будет код для статистики заходов на эту страницу
+    # и для записи фидбека
+    return render(request, 'contacts.html', {})
@@ -20,20 +20,23 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
-    'blog',
+    'blog.apps.BlogConfig',
 ]
 
 MIDDLEWARE = [
+    'blog.middleware.QueryBudgetMiddleware',
+    'blog.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(-1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
 
 INTERNAL_IPS = ['127.0.0.1']
 
@@ -43,7 +46,16 @@ TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
-STATIC_ROOT = ''
+STATIC_ROOT = env.str('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+STATICFILES_STORAGE = 'blog.static_files.CompressedManifestStaticFilesStorage'
+SERVE_STATIC = env.bool('SERVE_STATIC', not DEBUG)
+STATIC_CACHE_TIMEOUT = env.int('STATIC_CACHE_TIMEOUT', 60 * 60)
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+TEMPLATE_CACHED_LOADER = env.bool('TEMPLATE_CACHED_LOADER', not DEBUG)
 
 TEMPLATES = [
     {
@@ -56,21 +68,131 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.fragment_cache',
             ],
         },
     },
 ]
+if TEMPLATE_CACHED_LOADER:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 
 WSGI_APPLICATION = 'sensive_blog.wsgi.application'
+ASGI_APPLICATION = 'sensive_blog.asgi.application'
+
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', False)
+ASYNC_DB_THREADS = env.int('ASYNC_DB_THREADS', 8)
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': env.str(
             'DATABASE_FILEPATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': env.int('DATABASE_CONN_MAX_AGE', 0 if DEBUG else 600),
+        'OPTIONS': {
+            'timeout': env.float('SQLITE_BUSY_TIMEOUT', 20),
+        },
     }
 }
 
+DATABASE_REPLICAS = []
+for replica_number, replica_filepath in enumerate(env.list('DATABASE_REPLICA_FILEPATHS', []), start=1):
+    replica_alias = f'replica_{replica_number}'
+    DATABASES[replica_alias] = {
+        **DATABASES['default'],
+        'NAME': replica_filepath,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(replica_alias)
+
+DATABASE_ROUTERS = ['blog.routers.PrimaryReplicaRouter']
+REPLICA_PIN_COOKIE = 'read_primary'
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', 15)
+
+SQLITE_PRODUCTION_MODE = env.bool('SQLITE_PRODUCTION_MODE', not DEBUG)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -env.int('SQLITE_CACHE_SIZE_KB', 64 * 1024),
+    'mmap_size': env.int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    'temp_store': 'MEMORY',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': env.str(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env.str('CACHE_LOCATION', 'sensive-blog'),
+    },
+    'pages': {
+        'BACKEND': env.str(
+            'PAGE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env.str('PAGE_CACHE_LOCATION', 'sensive-blog-pages'),
+    },
+    'template_fragments': {
+        'BACKEND': env.str(
+            'FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env.str('FRAGMENT_CACHE_LOCATION', 'sensive-blog-fragments'),
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int('FRAGMENT_CACHE_MAX_ENTRIES', 10000),
+        },
+    },
+    'query_stats': {
+        'BACKEND': env.str(
+            'QUERY_STATS_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': env.str('QUERY_STATS_CACHE_LOCATION', os.path.join(BASE_DIR, 'query_stats_cache')),
+    },
+}
+
+SIDEBAR_CACHE_TIMEOUT = env.int('SIDEBAR_CACHE_TIMEOUT', 60 * 15)
+CACHE_STALE_TIMEOUT = env.int('CACHE_STALE_TIMEOUT', 60 * 5)
+CACHE_LOCK_TIMEOUT = env.int('CACHE_LOCK_TIMEOUT', 30)
+CACHE_EARLY_REFRESH_BETA = env.float('CACHE_EARLY_REFRESH_BETA', 1.0)
+
+PAGE_CACHE_ALIAS = 'pages'
+PAGE_CACHE_TIMEOUT = env.int('PAGE_CACHE_TIMEOUT', 60 * 5)
+
+FRAGMENT_CACHE_TIMEOUT = env.int('FRAGMENT_CACHE_TIMEOUT', 60 * 60)
+
+SITEMAP_SHARD_SIZE = env.int('SITEMAP_SHARD_SIZE', 50000)
+FEED_CACHE_DIR = env.str('FEED_CACHE_DIR', os.path.join(BASE_DIR, 'feed_cache'))
+
+API_PAGE_SIZE = env.int('API_PAGE_SIZE', 20)
+API_MAX_PAGE_SIZE = env.int('API_MAX_PAGE_SIZE', 100)
+
+LIKES_FLUSH_INTERVAL = env.int('LIKES_FLUSH_INTERVAL', 10)
+
+QUERY_BUDGET_DEFAULT = env.int('QUERY_BUDGET_DEFAULT', 15)
+QUERY_BUDGETS = {
+    'index': 10,
+    'post_detail': 20,
+    'tag_filter': 10,
+    'contacts': 0,
+    'blog_post_changelist': 50,
+    'blog_comment_changelist': 50,
+}
+QUERY_STATS_CACHE_ALIAS = 'query_stats'
+QUERY_STATS_FLUSH_EVERY = env.int('QUERY_STATS_FLUSH_EVERY', 100)
+QUERY_STATS_MAX_SAMPLES = 1000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'blog': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',  # noqa: E501
@@ -100,3 +222,7 @@ STATIC_URL = '/static/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_WIDTHS = [320, 640, 960]
+THUMBNAIL_QUALITY = env.int('THUMBNAIL_QUALITY', 80)
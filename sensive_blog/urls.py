@@ -1,17 +1,43 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
-from blog import views
+from blog import api, views
+from blog.static_files import serve_static
+
+if settings.ASYNC_VIEWS:
+    index_view, post_detail_view, tag_filter_view = views.async_index, views.async_post_detail, views.async_tag_filter
+    archive_view = views.async_archive
+else:
+    index_view, post_detail_view, tag_filter_view = views.index, views.post_detail, views.tag_filter
+    archive_view = views.archive
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('page/<int:page>', views.index, name='index'),
-    path('post/<slug:slug>', views.post_detail, name='post_detail'),
-    path('tag/<slug:tag_title>', views.tag_filter, name='tag_filter'),
+    path('page/<int:page>', index_view, name='index'),
+    path('post/<slug:slug>', post_detail_view, name='post_detail'),
+    path('post/<slug:slug>/comments', views.post_comments, name='post_comments'),
+    path('post/<slug:slug>/like', views.toggle_like, name='toggle_like'),
+    path('tag/<slug:tag_title>', tag_filter_view, name='tag_filter'),
+    path('archive/<int:year>/', archive_view, name='archive'),
+    path('archive/<int:year>/page/<int:page>', archive_view, name='archive'),
+    path('archive/<int:year>/<int:month>/', archive_view, name='archive'),
+    path('archive/<int:year>/<int:month>/page/<int:page>', archive_view, name='archive'),
+    re_path(r'^tag/(?P<tag_title>[-a-zA-Z0-9_]+)/(?P<feed_format>rss|atom)\.xml$', views.tag_feed, name='tag_feed'),
+    re_path(r'^feed/(?P<feed_format>rss|atom)\.xml$', views.feed, name='feed'),
+    path('sitemap.xml', views.sitemap_index, name='sitemap'),
+    path('sitemap-<int:shard>.xml', views.sitemap_shard, name='sitemap_shard'),
+    path('api/posts/', api.posts_list, name='api_posts'),
+    path('api/posts/<slug:slug>/', api.post_detail, name='api_post_detail'),
+    path('api/posts/<slug:slug>/comments/', api.post_comments, name='api_post_comments'),
+    path('api/tags/', api.tags_list, name='api_tags'),
+    path('search/', views.search, name='search'),
     path('contacts/', views.contacts, name='contacts'),
-    path('__debug__/', include('debug_toolbar.urls')),
-    path('', views.index, name='index'),
+    path('', index_view, name='index'),
 ]
+if settings.DEBUG:
+    urlpatterns.insert(-1, path('__debug__/', include('debug_toolbar.urls')))
+if settings.SERVE_STATIC:
+    urlpatterns.insert(0, re_path(rf'^{settings.STATIC_URL.strip("/")}/(?P<path>.+)$', serve_static))
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)